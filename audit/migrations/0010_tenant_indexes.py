@@ -0,0 +1,21 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0009_alter_ledger_entries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['organization', 'date'], name='entry_org_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['organization', 'date'], name='expense_org_date_idx'),
+        ),
+    ]
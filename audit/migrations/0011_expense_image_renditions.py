@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0010_tenant_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -22,12 +22,21 @@ class Expense(models.Model):
     category = models.ForeignKey(
         "ExpenseCategory", on_delete=models.SET_NULL, null=True
     )
-    image = models.ImageField(upload_to="expense_images", blank=True, null=True)
+    image = models.ImageField(
+        upload_to="expense_images", blank=True, null=True, db_index=True
+    )
+    # See Variant.image_renditions.
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     organization = models.ForeignKey(
         "user.Organization", on_delete=models.CASCADE, null=True, blank=True
     )
     requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["organization", "date"], name="expense_org_date_idx")
+        ]
+
     def __str__(self):
         return self.name
 
@@ -54,6 +63,9 @@ class Entry(models.Model):
     
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["organization", "date"], name="entry_org_date_idx")
+        ]
 
 class LedgerTypeEnum(models.TextChoices):
     CAPITAL = "CAPITAL", "Capital" #Credit
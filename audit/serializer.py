@@ -2,21 +2,24 @@ from rest_framework import serializers
 
 from audit.models import Expense, ExpenseCategory
 from inventory.serializers.user import UserOutSerializer
+from merak.fields import RenditionsField
+from merak.sparse import SparseFieldsSerializerMixin
 from user.models import User
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     requested_user = UserOutSerializer(read_only=True, source="requested_by")
     requested_by = serializers.PrimaryKeyRelatedField(
         write_only=True, queryset=User.objects.all()
     )
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Expense
         fields = "__all__"
 
 
-class ExpenseCategorySerializer(serializers.ModelSerializer):
+class ExpenseCategorySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ExpenseCategory
         fields = "__all__"
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from audit.models import Expense
+from inventory.services.rendition import rendition_names
+from inventory.tasks import queue_renditions
+from merak.files import register_file_field
+
+register_file_field(Expense, "image", derived=rendition_names)
+
+
+@receiver(post_save, sender=Expense)
+def render_expense_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        queue_renditions(instance)
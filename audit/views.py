@@ -6,18 +6,22 @@ from django.views.generic.base import View
 from django.shortcuts import get_object_or_404, render
 from rest_framework.response import Response
 
+from merak.sparse import SparseFieldsMixin
 from user.models import Customer
 
-class ExpenseViewSet(ModelViewSet):
+class ExpenseViewSet(SparseFieldsMixin, ModelViewSet):
     serializer_class = ExpenseSerializer
     queryset = Expense.objects.all()
 
     def get_queryset(self):
-        print(self.queryset.filter(organization=self.request.user.organization))
-        return self.queryset.filter(organization=self.request.user.organization)
+        queryset = self.queryset.filter(organization=self.request.user.organization)
+        lookups = self.get_sparse_lookups()
+        if lookups is None or "requested_by" in lookups:
+            queryset = queryset.select_related("requested_by")
+        return queryset
 
 
-class ExpenseCategoryViewSet(ModelViewSet):
+class ExpenseCategoryViewSet(SparseFieldsMixin, ModelViewSet):
     serializer_class = ExpenseCategorySerializer
     queryset = ExpenseCategory.objects.all()
 
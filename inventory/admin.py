@@ -3,13 +3,20 @@ import uuid
 from django.contrib import admin
 
 from inventory.models import (
+    CatalogImport,
+    DailyRevenue,
+    DailySales,
     Order,
     OrderItem,
     Product,
+    StockMovement,
+    StockSnapshot,
     Variant,
     VarientField,
     VariantFieldName,
 )
+from inventory.services.sku import assign_skus
+from inventory.services.stock import record_movements
 
 
 class CustomProduct(admin.ModelAdmin):
@@ -23,11 +30,22 @@ class CustomVariant(admin.ModelAdmin):
     model = Variant
     list_display = ("__str__", "price")
 
-    def save_related(self, request, form,formsets, change) -> None:
-        super().save_related(request, form, formsets, change)
-        form.instance.set_sku()
-        return super().save_related(request, form, formsets, change)
-        
+    def get_readonly_fields(self, request, obj=None):
+        # Stock of existing variants only changes through the journal.
+        if obj is not None:
+            return ("quantity",)
+        return ()
+
+    def save_model(self, request, obj, form, change):
+        # The sku is built from the submitted fields before the first insert.
+        assign_skus([obj], [form.cleaned_data.get("field", [])])
+        super().save_model(request, obj, form, change)
+        if not change:
+            record_movements(
+                {obj.id: obj.quantity}, StockMovement.Reason.ADJUST, user=request.user
+            )
+
+
 class CustomVarientField(admin.ModelAdmin):
     model = VarientField
     list_display = ("name", "value")
@@ -37,7 +55,7 @@ class CustomVarientField(admin.ModelAdmin):
 class CustomOrder(admin.ModelAdmin):
     model = Order
     readonly_fields = ("uuid",)
-    list_display = ("uuid", "ordered_by", "ordered_date", "status")
+    list_display = ("uuid", "ordered_by", "ordered_date", "status", "total")
 
 
 admin.site.register(Product, CustomProduct)
@@ -46,3 +64,8 @@ admin.site.register(VarientField, CustomVarientField)
 admin.site.register(Order, CustomOrder)
 admin.site.register(OrderItem)
 admin.site.register(VariantFieldName)
+admin.site.register(DailyRevenue)
+admin.site.register(DailySales)
+admin.site.register(CatalogImport)
+admin.site.register(StockMovement)
+admin.site.register(StockSnapshot)
@@ -0,0 +1,39 @@
+from django.db import transaction
+from rest_framework import mixins
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.viewsets import GenericViewSet
+
+from inventory.models import CatalogImport
+from inventory.serializers.product import CatalogImportSerializer
+from inventory.tasks import import_catalog_task
+from user.permissions import UserIsEditor, UserIsOwner
+
+
+class CatalogImportView(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    GenericViewSet,
+):
+    """Upload a CSV or JSON lines catalog and follow its import.
+
+    The import runs in the background, poll the returned import for its
+    status and progress. See inventory.services.catalog for the columns.
+    """
+
+    queryset = CatalogImport.objects.all()
+    serializer_class = CatalogImportSerializer
+    parser_classes = [MultiPartParser, FormParser]
+    permission_classes = [UserIsOwner | UserIsEditor]
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .filter(organization=self.request.user.organization)
+            .order_by("-created_at")
+        )
+
+    def perform_create(self, serializer):
+        catalog_import = serializer.save()
+        transaction.on_commit(lambda: import_catalog_task.delay(catalog_import.id))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from drf_yasg.utils import swagger_auto_schema
+
+from inventory.models import Product
+from inventory.serializers.order import EarningQuerySerializer, SalesQuerySerializer
+from inventory.services.earning import (
+    get_earning_by_period,
+    get_earning_by_staff,
+    get_earning_summary,
+    get_product_sales,
+    get_top_variants,
+)
+from user.permissions import UserIsOwner
+
+
+def get_date_range(query, days=30):
+    """``since`` and ``until`` of a validated query, the last ``days`` days
+    by default."""
+    until = query.validated_data.get("until", timezone.localdate())
+    since = query.validated_data.get("since", until - timedelta(days=days))
+    return since, until
+
+
+class EarningView(APIView):
+    """Earnings of the organization, by default over the last 30 days."""
+
+    permission_classes = [IsAuthenticated, UserIsOwner]
+
+    @swagger_auto_schema(query_serializer=EarningQuerySerializer)
+    def get(self, request):
+        query = EarningQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since, until = get_date_range(query)
+
+        organization = request.user.organization
+        return Response(
+            {
+                **get_earning_summary(organization),
+                "by_period": get_earning_by_period(
+                    organization, query.validated_data["period"], since, until
+                ),
+                "by_staff": get_earning_by_staff(organization, since, until),
+            }
+        )
+
+
+class TopVariantsView(APIView):
+    """Best selling variants of the organization, by default over the last week."""
+
+    permission_classes = [IsAuthenticated, UserIsOwner]
+
+    @swagger_auto_schema(query_serializer=SalesQuerySerializer)
+    def get(self, request):
+        query = SalesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since, until = get_date_range(query, days=7)
+        return Response(
+            get_top_variants(
+                request.user.organization,
+                since,
+                until,
+                limit=query.validated_data["limit"],
+            )
+        )
+
+
+class ProductSalesView(APIView):
+    """Units and revenue of one product per period, by default over 30 days."""
+
+    permission_classes = [IsAuthenticated, UserIsOwner]
+
+    @swagger_auto_schema(query_serializer=EarningQuerySerializer)
+    def get(self, request, uuid):
+        query = EarningQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since, until = get_date_range(query)
+        product = get_object_or_404(
+            Product, uuid=uuid, organization=request.user.organization
+        )
+        return Response(
+            get_product_sales(product, query.validated_data["period"], since, until)
+        )
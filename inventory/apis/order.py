@@ -9,7 +9,14 @@ from inventory.models import (
 
 from drf_yasg.utils import swagger_auto_schema
 
-from inventory.serializers.order import OrderOutSerializer
+from inventory.serializers.order import OrderOutSerializer, OrderTransitionSerializer
+from inventory.services.order import with_order_details
+from inventory.services.transition import (
+    ACTIONS,
+    assignable_to,
+    transition_order,
+    transition_orders,
+)
 
 
 user_model = get_user_model()
@@ -20,37 +27,40 @@ class OrderByActionView(APIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        responses={200: OrderOutSerializer(many=True)},
+        responses={200: OrderOutSerializer},
     )
     def get(self, request, uuid, action):
-        try:
-            order = Order.objects.get(
-                uuid=uuid,
-                assigned_to__in=[request.user, None],
-                status="PENDING",
-                owned_by__in=[request.user.admin, request.user],
-            )
-        except Order.DoesNotExist:
+        if action not in ACTIONS:
+            return Response(data={"detail": "Invalid action."}, status=400)
+        if not transition_order(request.user, uuid, action):
             return Response(data={"detail": "Order doesn't exists."}, status=404)
+        order = with_order_details(Order.objects.filter(uuid=uuid)).get()
+        return Response(OrderOutSerializer(order).data)
 
-        if action == "accept":
-            order = order.first()
-            order.status = "ACCEPTED"
-            if order.assigned_to is None:
-                order.assigned_to = request.user
-            order.save()
-            return Response(OrderOutSerializer(order).data)
-        elif action == "reject":
-            order.assigned_to = None
-            order.save()
-            return Response(OrderOutSerializer(order).data)
-        elif action == "reject_accepted":
-            order.assigned_to = None
-            order.status = "PENDING"
-            order.save()
-            return Response(OrderOutSerializer(order).data)
-        else:
-            return Response(data={"detail": "Invalid action."}, status=400)
+
+class OrderBatchActionView(APIView):
+    """Apply one action to many orders in a single request.
+
+    Orders that were already moved by somebody else, or that the action
+    doesn't apply to, are listed in ``failed``.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(request_body=OrderTransitionSerializer)
+    def post(self, request):
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uuids = list(dict.fromkeys(serializer.validated_data["orders"]))
+        moved = set(
+            transition_orders(request.user, uuids, serializer.validated_data["action"])
+        )
+        return Response(
+            {
+                "moved": [uuid for uuid in uuids if uuid in moved],
+                "failed": [uuid for uuid in uuids if uuid not in moved],
+            }
+        )
 
 class GetOrderByActionView(APIView):
     permission_classes = [IsAuthenticated]
@@ -60,17 +70,21 @@ class GetOrderByActionView(APIView):
     )
     def get(self, request, action):
         if action == "pending":
-            order = Order.objects.filter(
-                assigned_to__in=[request.user, None],
-                status="PENDING",
-                owned_by__in=[request.user.admin, request.user],
+            order = with_order_details(
+                Order.objects.filter(
+                    assignable_to(request.user),
+                    status="PENDING",
+                    owned_by__in=[request.user.admin, request.user],
+                )
             )
             return Response(OrderOutSerializer(order, many=True).data)
         elif action == "accepted":
-            order = Order.objects.filter(
-                assigned_to=request.user,
-                status="ACCEPTED",
-                owned_by__in=[request.user.admin, request.user],
+            order = with_order_details(
+                Order.objects.filter(
+                    assigned_to=request.user,
+                    status="ACCEPTED",
+                    owned_by__in=[request.user.admin, request.user],
+                )
             )
             return Response(OrderOutSerializer(order, many=True).data)
         else:
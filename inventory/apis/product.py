@@ -1,15 +1,41 @@
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 
+from inventory.cache import CatalogCacheMixin
 from inventory.filters import VariantFilter
 from inventory.models import (
     Product,
+    StockMovement,
     Variant,
     VarientField,
 )
-from inventory.serializers.product import FieldSerializer, ProductInSerializer, ProductOutSerializer, VairantOutSerializer, VariantInSerializer
+from inventory.serializers.export import ExportQuerySerializer
+from inventory.services.export import VARIANT_EXPORT_FIELDS, export_response
+from inventory.services.product import (
+    create_variants,
+    generate_variant_matrix,
+    with_default_variant,
+    with_variant_fields,
+)
+from inventory.services.stock import move_stock
+from inventory.serializers.product import (
+    FieldSerializer,
+    ProductInSerializer,
+    ProductOutSerializer,
+    StockAdjustSerializer,
+    StockMovementQuerySerializer,
+    StockMovementSerializer,
+    VairantOutSerializer,
+    VariantBatchSerializer,
+    VariantInSerializer,
+    VariantMatrixSerializer,
+)
+from merak.conditional import ConditionalGetMixin
+from merak.pagination import LimitOffsetOrCursorPagination
+from merak.sparse import SparseFieldsMixin
 from user.permissions import UserIsOwner, UserIsEditor
 
 from drf_yasg.utils import swagger_auto_schema
@@ -18,29 +44,39 @@ from drf_yasg.utils import swagger_auto_schema
 user_model = get_user_model()
 
 
-class VariantFieldView(ModelViewSet):
+class VariantFieldView(SparseFieldsMixin, CatalogCacheMixin, ModelViewSet):
     serializer_class = FieldSerializer
     queryset = VarientField.objects.all()
     permission_classes = [IsAuthenticated, UserIsOwner, UserIsEditor]
 
     def get_queryset(self):
-        return (
-            super().get_queryset().filter(organization=self.request.user.organization)
+        queryset = super().get_queryset().filter(
+            organization=self.request.user.organization
         )
+        lookups = self.get_sparse_lookups()
+        if lookups is None or "name" in lookups:
+            queryset = queryset.select_related("name")
+        return queryset
 
 
-class VariantView(ModelViewSet):
+class VariantView(
+    SparseFieldsMixin, CatalogCacheMixin, ConditionalGetMixin, ModelViewSet
+):
     queryset = Variant.objects.all()
     serializer_class = VairantOutSerializer
     performer_serializer_class = VariantInSerializer
     filterset_class = VariantFilter
     lookup_field = "sku"
     permission_classes = [UserIsOwner|UserIsEditor]
-
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
+    # The payload nests the variant's fields.
+    version_fields = ("updated_at", "field__updated_at")
 
     def get_queryset(self):
-        return (
-            super().get_queryset().filter(organization=self.request.user.organization)
+        return with_variant_fields(
+            super().get_queryset().filter(organization=self.request.user.organization),
+            self.get_sparse_lookups(),
         )
 
     @swagger_auto_schema(
@@ -53,7 +89,6 @@ class VariantView(ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         variant = serializer.save()
-        variant.set_sku()
         return Response(self.serializer_class(variant).data)
 
     @swagger_auto_schema(
@@ -62,24 +97,108 @@ class VariantView(ModelViewSet):
     )
     def update(self, request, *args, **kwargs):
         variant = self.get_object()
-        serializer = self.performer_serializer_class(variant, data=request.data)
+        serializer = self.performer_serializer_class(
+            variant, data=request.data, context={"request": request}
+        )
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(self.serializer_class(variant).data)
 
+    @swagger_auto_schema(
+        request_body=VariantBatchSerializer,
+        responses={201: serializer_class(many=True)},
+    )
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Create many variants of one product in one request, all or none."""
+        serializer = VariantBatchSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        variants = create_variants(
+            serializer.validated_data["product"],
+            serializer.validated_data["variants"],
+            request.user,
+        )
+        variants = with_variant_fields(
+            Variant.objects.filter(id__in=[variant.id for variant in variants])
+        )
+        return Response(
+            self.serializer_class(variants.order_by("id"), many=True).data, status=201
+        )
+
+    @swagger_auto_schema(
+        query_serializer=StockMovementQuerySerializer,
+        responses={200: StockMovementSerializer(many=True)},
+    )
+    @action(detail=True, methods=["get"])
+    def movements(self, request, sku=None):
+        """Stock history of the variant, newest first."""
+        query = StockMovementQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        movements = self.get_object().movements.all()
+        if "since" in query.validated_data:
+            movements = movements.filter(created_at__gte=query.validated_data["since"])
+        if "until" in query.validated_data:
+            movements = movements.filter(created_at__lte=query.validated_data["until"])
+        page = self.paginate_queryset(movements.order_by("-created_at", "-id"))
+        return self.get_paginated_response(
+            StockMovementSerializer(page, many=True).data
+        )
+
+    @swagger_auto_schema(
+        request_body=StockAdjustSerializer, responses={200: serializer_class}
+    )
+    @action(detail=True, methods=["post"])
+    def adjust(self, request, sku=None):
+        """Add (or with a negative quantity, remove) stock by hand."""
+        serializer = StockAdjustSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variant = self.get_object()
+        move_stock(
+            {variant.id: serializer.validated_data["quantity"]},
+            StockMovement.Reason.ADJUST,
+            user=request.user,
+        )
+        variant.refresh_from_db()
+        return Response(self.serializer_class(variant).data)
+
+    @swagger_auto_schema(query_serializer=ExportQuerySerializer)
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream every variant of the organization as CSV or NDJSON."""
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(
+            Variant.objects.filter(organization=request.user.organization)
+        )
+        return export_response(
+            queryset,
+            VARIANT_EXPORT_FIELDS,
+            query.validated_data["output"],
+            query.validated_data.get("since"),
+            filename="variants",
+        )
+
 
-class ProductView(ModelViewSet):
+class ProductView(
+    SparseFieldsMixin, CatalogCacheMixin, ConditionalGetMixin, ModelViewSet
+):
 
     queryset = Product.objects.all()
     serializer_class = ProductOutSerializer
     performer_serializer_class = ProductInSerializer
     lookup_field = "uuid"
     permission_classes = [UserIsOwner| UserIsEditor]
-
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
+    # The default variant's price and image are part of the payload.
+    version_fields = ("updated_at", "variant__updated_at")
 
     def get_queryset(self):
-        return (
-            super().get_queryset().filter(organization=self.request.user.organization)
+        return with_default_variant(
+            super().get_queryset().filter(organization=self.request.user.organization),
+            self.get_sparse_lookups(),
         )
 
     @swagger_auto_schema(
@@ -108,4 +227,30 @@ class ProductView(ModelViewSet):
         product = serializer.save()
         return Response(self.serializer_class(product).data, status=201)
 
+    @swagger_auto_schema(
+        request_body=VariantMatrixSerializer,
+        responses={201: VairantOutSerializer(many=True)},
+    )
+    @action(detail=True, methods=["post"])
+    def matrix(self, request, uuid=None):
+        """Create a variant for every combination of option values.
+
+        ``{"axes": {"size": ["s", "m"], "color": ["red", "blue"]}, "price": 10}``
+        creates four variants. Combinations the product has are skipped.
+        """
+        serializer = VariantMatrixSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        variants = generate_variant_matrix(
+            self.get_object(),
+            serializer.validated_data["axes"],
+            serializer.validated_data["price"],
+            serializer.validated_data["quantity"],
+            request.user,
+        )
+        variants = with_variant_fields(
+            Variant.objects.filter(id__in=[variant.id for variant in variants])
+        )
+        return Response(
+            VairantOutSerializer(variants.order_by("id"), many=True).data, status=201
+        )
 
@@ -1,7 +1,7 @@
-import itertools
 from django_filters import rest_framework as filters
 from django.db.models import Q
 from inventory.models import Order, Variant
+from inventory.services.search import search_variants
 
 
 class VariantFilter(filters.FilterSet):
@@ -13,26 +13,7 @@ class VariantFilter(filters.FilterSet):
         fields = ["sku", "product"]
 
     def sku_filter(self, queryset, name, value):
-        combinations = []
-        value = [value for value in value.split(" ") if value]
-        for r in range(len(value) + 1):
-            for words in itertools.combinations(value, r):
-                combinations.append(words)
-
-        sku_word_list = []
-
-        for combination in combinations:
-            sku_list = []
-
-            for word in combination:
-                sku_list.append(word)
-            sku_word = "_".join(sku_list)
-            sku_word_list.append(sku_word)
-        q = Q()
-        for word in sku_word_list[1:]:
-            qs = Q(sku__icontains=word)
-            q |= qs
-        return queryset.filter(q)
+        return search_variants(queryset, value)
 
     def get_variant_of_product(self, queryset, name, value):
         return queryset.filter(product__uuid=value)
@@ -40,6 +21,8 @@ class VariantFilter(filters.FilterSet):
 
 class OrderFilter(filters.FilterSet):
     assigned_status = filters.BooleanFilter(method="assigned_status_filter")
+    min_total = filters.NumberFilter(field_name="total", lookup_expr="gte")
+    max_total = filters.NumberFilter(field_name="total", lookup_expr="lte")
 
     class Meta:
         model = Order
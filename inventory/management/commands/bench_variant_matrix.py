@@ -0,0 +1,112 @@
+# Compare generating a variant matrix against creating the variants one by one
+
+import itertools
+import time
+import uuid
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from inventory.models import Product
+from inventory.serializers.product import VariantInSerializer
+from inventory.services.product import generate_variant_matrix, get_or_create_fields
+from user.models import Organization, User
+
+SIZES = ["xxs", "xs", "s", "m", "l", "xl", "xxl", "3xl", "4xl", "5xl"]
+FITS = ["slim", "regular", "relaxed", "oversized", "tall"]
+
+
+def get_axes(size):
+    """Size by color by fit axes with roughly ``size`` combinations."""
+    colors = -(-size // (len(SIZES) * len(FITS)))
+    return {
+        "size": SIZES,
+        "color": ["color-{}".format(i) for i in range(colors)],
+        "fit": FITS,
+    }
+
+
+def create_one_by_one(product, axes, user):
+    """What a client does today: one VariantView.create call per combination."""
+    fields = get_or_create_fields(
+        [(name, value) for name, values in axes.items() for value in values],
+        user.organization,
+    )
+    request = SimpleNamespace(user=user)
+    for combination in itertools.product(
+        *[[(name, value) for value in values] for name, values in axes.items()]
+    ):
+        serializer = VariantInSerializer(
+            data={
+                "product": product.id,
+                "price": 10,
+                "quantity": 5,
+                "field": [fields[key].id for key in combination],
+            },
+            context={"request": request},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+
+class Command(BaseCommand):
+    help = "Benchmark the variant matrix generator. Nothing is kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[250, 1000, 5000])
+        parser.add_argument(
+            "--one-by-one-max",
+            type=int,
+            default=1000,
+            help="Skip the one by one comparison above this many variants",
+        )
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            axes = get_axes(size)
+            combinations = 1
+            for values in axes.values():
+                combinations *= len(values)
+
+            matrix = self.bench(
+                lambda product, user: generate_variant_matrix(
+                    product, axes, 10, 5, user
+                )
+            )
+            self.stdout.write(
+                "{:>6} variants  matrix     {:8.2f}s {:>7} queries".format(
+                    combinations, *matrix
+                )
+            )
+            if combinations <= options["one_by_one_max"]:
+                single = self.bench(
+                    lambda product, user: create_one_by_one(product, axes, user)
+                )
+                self.stdout.write(
+                    "{:>6} variants  one by one {:8.2f}s {:>7} queries".format(
+                        combinations, *single
+                    )
+                )
+
+    def bench(self, create):
+        """``(seconds, queries)`` of ``create`` on a fresh organization."""
+        with transaction.atomic():
+            owner = User.objects.create_user(email=f"bench-{uuid.uuid4()}@merak.local")
+            owner.organization = Organization.objects.create(name="bench", owner=owner)
+            owner.save()
+            product = Product.objects.create(
+                name="tee", uuid=str(uuid.uuid4()), organization=owner.organization
+            )
+            queries = []
+
+            def count(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                create(product, owner)
+                seconds = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return seconds, len(queries)
@@ -0,0 +1,111 @@
+# Compare the variant search index against the old combinatorial sku filter
+
+import itertools
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+
+from inventory.models import Product, Variant, VariantSearchTerm
+from inventory.services.search import build_search_terms, search_variants
+from inventory.utils import bulk_create_returning_pks
+from user.models import Organization, User
+
+ADJECTIVES = ["classic", "slim", "relaxed", "vintage", "sport", "winter", "summer", "basic"]
+NOUNS = ["shirt", "tshirt", "hoodie", "jacket", "trouser", "cap", "sock", "scarf"]
+COLORS = ["red", "blue", "black", "white", "green", "grey", "navy", "olive"]
+SIZES = ["xs", "s", "m", "l", "xl", "xxl"]
+VARIANTS_PER_PRODUCT = 48
+BATCH_SIZE = 5000
+
+
+def legacy_sku_filter(queryset, value):
+    """The filter the search index replaced: 2^n OR'ed icontains clauses."""
+    combinations = []
+    value = [value for value in value.split(" ") if value]
+    for r in range(len(value) + 1):
+        for words in itertools.combinations(value, r):
+            combinations.append("_".join(words))
+    q = Q()
+    for word in combinations[1:]:
+        q |= Q(sku__icontains=word)
+    return queryset.filter(q)
+
+
+def timed(queryset):
+    """Milliseconds to count the matches and fetch the first page."""
+    start = time.perf_counter()
+    queryset.count()
+    list(queryset[:10])
+    return (time.perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    help = "Benchmark variant search against the legacy sku filter. Nothing is kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+        )
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            with transaction.atomic():
+                self.bench(size)
+                transaction.set_rollback(True)
+
+    def bench(self, size):
+        rng = random.Random(size)
+        owner = User.objects.create_user(email=f"bench-{uuid.uuid4()}@merak.local")
+        organization = Organization.objects.create(name="bench", owner=owner)
+
+        self.stdout.write(f"Creating {size} variants...")
+        products = bulk_create_returning_pks(
+            Product,
+            [
+                Product(
+                    name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} m{i}",
+                    uuid=str(uuid.uuid4()),
+                    organization=organization,
+                )
+                for i in range(-(-size // VARIANTS_PER_PRODUCT))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        for start in range(0, size, BATCH_SIZE):
+            variants = []
+            for i in range(start, min(start + BATCH_SIZE, size)):
+                product = products[i // VARIANTS_PER_PRODUCT]
+                variants.append(
+                    Variant(
+                        product=product,
+                        price=1,
+                        sku=f"{product.name}-{rng.choice(COLORS)}-{rng.choice(SIZES)}-{i}",
+                        organization=organization,
+                    )
+                )
+            variants = bulk_create_returning_pks(Variant, variants)
+            prefetch_related_objects(variants, "field")
+            VariantSearchTerm.objects.bulk_create(
+                build_search_terms(variants), batch_size=BATCH_SIZE
+            )
+
+        product = rng.choice(products)
+        model = product.name.split()[-1]
+        queries = [
+            model,
+            f"{model} {rng.choice(COLORS)}",
+            f"{product.name} {rng.choice(SIZES)}",
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(COLORS)} xl",
+        ]
+        queryset = Variant.objects.filter(organization=organization)
+        for query in queries:
+            legacy = timed(legacy_sku_filter(queryset, query))
+            indexed = timed(search_variants(queryset, query))
+            self.stdout.write(
+                f"{size:>9} variants  {query!r:<34} legacy {legacy:9.1f}ms"
+                f"  index {indexed:9.1f}ms"
+            )
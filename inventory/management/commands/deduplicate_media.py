@@ -0,0 +1,88 @@
+# Move uploads saved before content addressing to their hashed names
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.cache import bump_catalog_version
+from inventory.models import Variant
+from inventory.services.rendition import rendition_names
+from merak.files import FILE_FIELDS, release_file
+
+
+def legacy_names(model, field):
+    """File names ``model`` rows use that aren't content addressed yet."""
+    names = (
+        model._default_manager.exclude(**{field: ""})
+        .exclude(**{f"{field}__isnull": True})
+        .values_list(field, flat=True)
+        .distinct()
+    )
+    return [name for name in names if not default_storage.is_content_name(name)]
+
+
+class Command(BaseCommand):
+    help = "Store every upload under its content hash, once, and drop the copies"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report what would be saved"
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not getattr(storage, "content_addressed", False):
+            self.stderr.write("DEFAULT_FILE_STORAGE isn't content addressed")
+            return
+
+        moved = {}
+        missing = 0
+        size = 0
+        for model, field, _ in FILE_FIELDS:
+            for name in legacy_names(model, field):
+                if name in moved:
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                size += storage.size(name)
+                with storage.open(name, "rb") as content:
+                    if options["dry_run"]:
+                        moved[name] = storage.get_content_name(name, content)
+                    else:
+                        moved[name] = storage.save(name, content)
+
+        unique = set(moved.values())
+        self.stdout.write(
+            f"{len(moved)} files ({size / 2**20:.1f} MiB) hold {len(unique)} "
+            f"distinct contents, {missing} files are missing"
+        )
+        if options["dry_run"] or not moved:
+            return
+
+        now = timezone.now()
+        for model, field, _ in FILE_FIELDS:
+            fields = {f.name for f in model._meta.fields}
+            rows = model._default_manager.filter(**{f"{field}__in": list(moved)})
+            if model is Variant:
+                for organization_id in set(
+                    rows.values_list("organization_id", flat=True)
+                ):
+                    bump_catalog_version(organization_id)
+            for old, new in moved.items():
+                changes = {field: new}
+                if "image_renditions" in fields:
+                    # Rendered again, once per content, by generate_renditions.
+                    changes["image_renditions"] = {}
+                if "updated_at" in fields:
+                    changes["updated_at"] = now
+                model._default_manager.filter(**{field: old}).update(**changes)
+
+        released = sum(
+            release_file(storage, name, rendition_names(name)) for name in moved
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Removed {released} copies, run generate_renditions next"
+            )
+        )
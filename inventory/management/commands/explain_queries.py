@@ -0,0 +1,137 @@
+# Run EXPLAIN on the hot tenant-scoped queries and flag full table scans
+
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from audit.models import Entry, Expense
+from inventory.models import (
+    DailyRevenue,
+    DailySales,
+    Order,
+    Product,
+    Status,
+    StockMovement,
+    Variant,
+    VariantSearchTerm,
+)
+from user.models import Customer
+
+# Placeholder values, EXPLAIN only needs the shape of the query.
+ORGANIZATION = 1
+USER = 1
+
+
+def hot_queries():
+    """``{name: queryset}`` for the queries the API runs most."""
+    since = timezone.now() - timedelta(days=30)
+    orders = Order.objects.filter(organization_id=ORGANIZATION)
+    variants = Variant.objects.filter(organization_id=ORGANIZATION)
+    return {
+        "order list": orders.order_by("-ordered_date", "-id"),
+        "order list by status": orders.filter(status=Status.PENDING).order_by(
+            "-ordered_date"
+        ),
+        "orders changed since": orders.filter(updated_at__gte=since).order_by(
+            "updated_at", "id"
+        ),
+        "order by uuid and status": Order.objects.filter(
+            uuid="00000000-0000-0000-0000-000000000000", status=Status.PENDING
+        ),
+        "staff pending orders": Order.objects.filter(
+            assigned_to_id=USER, status=Status.PENDING
+        ),
+        "earning by staff": orders.filter(
+            status=Status.COMPLETED, completed_date__gte=since
+        ),
+        "daily revenue": DailyRevenue.objects.filter(
+            organization_id=ORGANIZATION, date__gte=since.date()
+        ),
+        "top variants": DailySales.objects.filter(
+            organization_id=ORGANIZATION, date__gte=since.date()
+        ),
+        "variant by sku": variants.filter(sku="shirt-red-m"),
+        "variant list": variants.order_by("-created_at", "-id"),
+        "variants changed since": variants.filter(updated_at__gte=since).order_by(
+            "updated_at", "id"
+        ),
+        "variant search term": VariantSearchTerm.objects.filter(term="shirt"),
+        "variant stock history": StockMovement.objects.filter(
+            variant_id=1, created_at__gte=since
+        ).order_by("-created_at", "-id"),
+        "product list": Product.objects.filter(organization_id=ORGANIZATION).order_by(
+            "-created_at", "-id"
+        ),
+        "customers": Customer.objects.filter(organization_id=ORGANIZATION),
+        "ledger entries": Entry.objects.filter(
+            organization_id=ORGANIZATION, date__gte=since.date()
+        ),
+        "expenses": Expense.objects.filter(
+            organization_id=ORGANIZATION, date__gte=since.date()
+        ),
+    }
+
+
+SQLITE_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\w+)")
+POSTGRES_SCAN = re.compile(r"\bSeq Scan on (\w+)")
+
+
+def find_full_scans(plan):
+    """Tables ``plan`` reads from start to end instead of through an index."""
+    tables = []
+    for line in plan.splitlines():
+        match = SQLITE_SCAN.search(line)
+        # "SCAN t USING INDEX i" walks an index in order, which is fine.
+        if match and "USING" not in line:
+            tables.append(match.group(1))
+        tables += POSTGRES_SCAN.findall(line)
+    return tables
+
+
+def explain(queryset):
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # Small tables are cheaper to scan, so the planner would pick a
+            # sequential scan whether or not an index exists.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+def audit_queries():
+    """``[(name, plan, full scans)]`` for every hot query."""
+    results = []
+    for name, queryset in hot_queries().items():
+        plan = explain(queryset)
+        results.append((name, plan, find_full_scans(plan)))
+    return results
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot tenant-scoped queries and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--plans", action="store_true", help="Print every query plan"
+        )
+
+    def handle(self, *args, **options):
+        flagged = 0
+        for name, plan, scans in audit_queries():
+            if scans:
+                flagged += 1
+                self.stdout.write(
+                    self.style.ERROR(f"{name}: full scan of {', '.join(scans)}")
+                )
+            else:
+                self.stdout.write(f"{name}: ok")
+            if options["plans"] or scans:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if flagged:
+            raise CommandError(f"{flagged} queries scan a whole table")
+        self.stdout.write(self.style.SUCCESS("No full table scans"))
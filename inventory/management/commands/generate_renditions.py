@@ -0,0 +1,72 @@
+# Render thumbnails for images uploaded before renditions existed
+
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from inventory.services.rendition import refresh_renditions
+
+MODELS = ("inventory.Variant", "audit.Expense")
+
+
+def _setup_worker():
+    # Forked workers must not share the parent's database connections.
+    django.setup()
+    connections.close_all()
+
+
+def _render(job):
+    model_label, pk = job
+    try:
+        return refresh_renditions(apps.get_model(model_label), pk), None
+    except Exception as error:  # a broken upload shouldn't stop the backfill
+        return False, "{} {}: {}".format(model_label, pk, error)
+
+
+def pending_jobs(model_label):
+    """``(model label, pk)`` of every row whose renditions are missing or stale."""
+    model = apps.get_model(model_label)
+    rows = (
+        model.objects.exclude(image="")
+        .exclude(image__isnull=True)
+        .values_list("pk", "image", "image_renditions")
+        .iterator()
+    )
+    for pk, image, renditions in rows:
+        if (renditions or {}).get("source") != image:
+            yield model_label, pk
+
+
+class Command(BaseCommand):
+    help = "Generate missing image renditions across a pool of processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=None)
+        parser.add_argument(
+            "--model", choices=MODELS, action="append", help="Default: all of them"
+        )
+
+    def handle(self, *args, **options):
+        jobs = [
+            job for label in options["model"] or MODELS for job in pending_jobs(label)
+        ]
+        self.stdout.write(f"{len(jobs)} images to render")
+        if not jobs:
+            return
+
+        connections.close_all()
+        rendered = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["processes"], initializer=_setup_worker
+        ) as pool:
+            for done, error in pool.map(_render, jobs, chunksize=20):
+                if error:
+                    failed += 1
+                    self.stderr.write(error)
+                rendered += done
+        self.stdout.write(
+            self.style.SUCCESS(f"Rendered {rendered} images, {failed} failed")
+        )
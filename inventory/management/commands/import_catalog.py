@@ -0,0 +1,59 @@
+# Stream a CSV or JSON lines catalog into an organization
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.catalog import BATCH_SIZE, FORMATS, guess_format, import_catalog
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import products and variants from a CSV or JSON lines file. Columns "
+        "other than product, description, price, quantity, sku, is_default and "
+        "taxable are variant fields."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--user", required=True, help="Email of the user the catalog belongs to"
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.select_related("organization").get(email=options["user"])
+        except User.DoesNotExist:
+            raise CommandError("User {} does not exist".format(options["user"]))
+        if user.organization is None:
+            raise CommandError("User {} has no organization".format(user.email))
+
+        start = time.perf_counter()
+
+        def progress(stats):
+            seconds = time.perf_counter() - start
+            self.stdout.write(
+                f"{stats['rows']} rows, {stats['variants']} variants, "
+                f"{stats['skipped']} skipped, {stats['failed']} failed "
+                f"({stats['rows'] / seconds:.0f} rows/sec)"
+            )
+
+        with open(options["path"], "rb") as stream:
+            stats = import_catalog(
+                stream,
+                options["format"] or guess_format(options["path"]),
+                user,
+                batch_size=options["batch_size"],
+                progress=progress,
+            )
+
+        for error in stats["errors"]:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {stats['products']} products and {stats['variants']} variants"
+            )
+        )
@@ -0,0 +1,23 @@
+# Recompute the per variant sales rollup from the order history
+
+from django.core.management.base import BaseCommand
+
+from inventory.services.earning import rebuild_sales
+from user.models import Organization
+
+
+class Command(BaseCommand):
+    help = "Rebuild DailySales from every completed order, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization", type=int, help="Only this organization's sales"
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        organization = None
+        if options["organization"] is not None:
+            organization = Organization.objects.get(pk=options["organization"])
+        counted = rebuild_sales(organization, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Counted {counted} completed orders"))
@@ -0,0 +1,21 @@
+# Fold recent stock movements into snapshots and check quantities against the journal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.services.stock import find_drift, take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Snapshot variant stock from the movement journal and report drift"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{take_snapshots()} snapshots taken")
+
+        drift = find_drift()
+        for variant_id, quantity, journaled in drift:
+            self.stderr.write(
+                f"variant {variant_id}: quantity {quantity}, journal says {journaled}"
+            )
+        if drift:
+            raise CommandError(f"{len(drift)} variants disagree with their journal")
+        self.stdout.write(self.style.SUCCESS("Every quantity matches its journal"))
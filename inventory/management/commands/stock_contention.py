@@ -0,0 +1,90 @@
+# Hammer one SKU from many threads to check stock reservation never oversells
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from inventory.models import Product, Variant
+from inventory.services.stock import OutOfStock, reserve_stock
+
+# Attempts per order before a busy database counts as a real failure.
+MAX_ATTEMPTS = 50
+
+
+def run_contention(variant_id, threads, orders_per_thread, quantity=1):
+    """Place ``threads * orders_per_thread`` orders on one variant concurrently.
+
+    Returns ``(sold, rejected, seconds)``. Orders the database refused because
+    of lock contention are retried up to MAX_ATTEMPTS times, so every order
+    ends as sold or rejected; an error that persists is raised.
+    """
+    sold = []
+    rejected = []
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        try:
+            for _ in range(orders_per_thread):
+                for attempt in range(1, MAX_ATTEMPTS + 1):
+                    try:
+                        reserve_stock({variant_id: quantity})
+                        sold.append(quantity)
+                    except OutOfStock:
+                        rejected.append(quantity)
+                    except OperationalError:
+                        # SQLite reports a busy table instead of waiting.
+                        if attempt == MAX_ATTEMPTS:
+                            raise
+                        time.sleep(0.001 * attempt)
+                        continue
+                    break
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return sum(sold), len(rejected), time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Measure concurrent orders/sec on one hot SKU and check for oversells"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stock", type=int, default=1000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--orders", type=int, default=200, help="Orders per thread")
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(name="stock-contention")
+        variant = Variant.objects.create(
+            product=product, price=1, quantity=options["stock"], sku=product.uuid
+        )
+        try:
+            sold, rejected, seconds = run_contention(
+                variant.id, options["threads"], options["orders"]
+            )
+            variant.refresh_from_db()
+        finally:
+            Variant.objects.filter(id=variant.id).delete()
+            product.delete()
+
+        total = options["threads"] * options["orders"]
+        self.stdout.write(
+            f"{total} orders in {seconds:.2f}s ({total / seconds:.0f} orders/sec), "
+            f"{sold} sold, {rejected} rejected, {variant.quantity} left"
+        )
+        if sold > options["stock"] or variant.quantity != options["stock"] - sold:
+            raise CommandError("Stock was oversold")
+        self.stdout.write(self.style.SUCCESS("No oversells"))
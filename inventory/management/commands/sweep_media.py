@@ -0,0 +1,33 @@
+# Delete the shared uploads nothing references any more
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from merak.files import sweep_files
+
+
+class Command(BaseCommand):
+    help = "Delete content addressed files no row uses, once they are old enough"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=24 * 60 * 60,
+            help="Seconds a file is kept after it was last stored or reused",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only list what would be deleted"
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not getattr(storage, "content_addressed", False):
+            self.stderr.write("DEFAULT_FILE_STORAGE isn't content addressed")
+            return
+
+        swept = sweep_files(storage, options["grace"], dry_run=options["dry_run"])
+        for name in swept:
+            self.stdout.write(name)
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(swept)} files"))
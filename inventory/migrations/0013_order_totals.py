@@ -0,0 +1,57 @@
+# Generated by Django 3.2.8 on 2026-10-18 17:23
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+TAX_RATE = Decimal("0.13")
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model("inventory", "Order")
+    orders = Order.objects.order_by("pk").prefetch_related("items__product")
+    last_pk = 0
+    while True:
+        chunk = list(orders.filter(pk__gt=last_pk)[:500])
+        if not chunk:
+            break
+        for order in chunk:
+            sub_total = taxable = Decimal("0")
+            for item in order.items.all():
+                if item.product is None:
+                    continue
+                line_total = item.product.price * item.quantity
+                sub_total += line_total
+                if item.product.taxable:
+                    taxable += line_total
+            order.sub_total = sub_total
+            order.tax = (taxable * TAX_RATE).quantize(Decimal("0.01"))
+            order.total = order.sub_total + order.tax
+        Order.objects.bulk_update(chunk, ["sub_total", "tax", "total"])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_variant_taxable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='sub_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
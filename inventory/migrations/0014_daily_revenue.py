@@ -0,0 +1,59 @@
+# Generated by Django 3.2.8 on 2026-10-18 17:24
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_daily_revenue(apps, schema_editor):
+    Order = apps.get_model("inventory", "Order")
+    DailyRevenue = apps.get_model("inventory", "DailyRevenue")
+
+    completed = Order.objects.filter(status="COMPLETED", organization__isnull=False)
+    completed.filter(completed_date__isnull=True).update(
+        completed_date=F("ordered_date")
+    )
+    rows = (
+        completed.annotate(day=TruncDate("completed_date"))
+        .values("organization_id", "day")
+        .annotate(orders=Count("id"), revenue=Sum("total"))
+        .order_by()
+    )
+    DailyRevenue.objects.bulk_create(
+        [
+            DailyRevenue(
+                organization_id=row["organization_id"],
+                date=row["day"],
+                orders=row["orders"],
+                revenue=row["revenue"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_customer'),
+        ('inventory', '0013_order_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.organization')),
+            ],
+            options={
+                'unique_together': {('organization', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 3.2.8 on 2026-10-18 17:34
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# A copy of inventory.services.search as of this migration, so later changes
+# to the app code don't change what migrating from scratch does.
+MAX_TERM_LENGTH = 32
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def get_search_terms(variant):
+    words = tokenize(variant.sku)
+    if variant.product:
+        words += tokenize(variant.product.name)
+    for field in variant.field.all():
+        words += tokenize(field.value)
+
+    terms = {}
+    for word in words:
+        word = word[:MAX_TERM_LENGTH]
+        for length in range(1, len(word)):
+            terms.setdefault(word[:length], False)
+        terms[word] = True
+    return terms
+
+
+def backfill_search_terms(apps, schema_editor):
+    Variant = apps.get_model("inventory", "Variant")
+    VariantSearchTerm = apps.get_model("inventory", "VariantSearchTerm")
+
+    variants = Variant.objects.order_by("pk").select_related("product")
+    last_pk = 0
+    while True:
+        chunk = list(variants.filter(pk__gt=last_pk).prefetch_related("field")[:500])
+        if not chunk:
+            break
+        VariantSearchTerm.objects.bulk_create(
+            [
+                VariantSearchTerm(
+                    variant=variant,
+                    term=term,
+                    is_word=is_word,
+                    organization_id=variant.organization_id,
+                )
+                for variant in chunk
+                for term, is_word in get_search_terms(variant).items()
+            ],
+            batch_size=1000,
+        )
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_customer'),
+        ('inventory', '0014_daily_revenue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('is_word', models.BooleanField(default=False)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='user.organization')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='inventory.variant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='variantsearchterm',
+            index=models.Index(fields=['term', 'variant'], name='inventory_v_term_e890e7_idx'),
+        ),
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
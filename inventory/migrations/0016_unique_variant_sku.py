@@ -0,0 +1,37 @@
+# Generated by Django 3.2.8 on 2026-10-18 17:48
+
+import uuid
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_skus(apps, schema_editor):
+    """Suffix every duplicated sku but the oldest so the constraint can apply."""
+    Variant = apps.get_model("inventory", "Variant")
+    duplicated = (
+        Variant.objects.exclude(sku="")
+        .values("sku")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("sku", flat=True)
+    )
+    for variant in Variant.objects.filter(sku__in=list(duplicated)).order_by("sku", "pk"):
+        if Variant.objects.filter(sku=variant.sku, pk__lt=variant.pk).exists():
+            variant.sku = variant.sku[:95] + uuid.uuid4().hex[:5]
+            variant.save(update_fields=["sku"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_variant_search_term'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_skus, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='variant',
+            constraint=models.UniqueConstraint(condition=models.Q(('sku', ''), _negated=True), fields=('sku',), name='unique_variant_sku'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.8 on 2026-10-18 17:51
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+
+def spread_created_at(apps, schema_editor):
+    # Existing rows all got the same created_at. Space them a microsecond
+    # apart in id order so the pagination cursor has no long runs of ties.
+    now = timezone.now()
+    for name in ("Product", "Variant"):
+        model = apps.get_model("inventory", name)
+        rows = list(model.objects.order_by("-id").only("id"))
+        for position, row in enumerate(rows):
+            row.created_at = now - timedelta(microseconds=position)
+        model.objects.bulk_update(rows, ["created_at"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_unique_variant_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(spread_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['organization', 'ordered_date', 'id'], name='order_org_ordered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='product_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='variant_org_created_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.8 on 2026-10-18 17:58
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    Variant = apps.get_model("inventory", "Variant")
+    Order = apps.get_model("inventory", "Order")
+    Variant.objects.update(updated_at=F("created_at"))
+    Order.objects.update(updated_at=Coalesce("completed_date", "ordered_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_catalog_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='variant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['organization', 'updated_at', 'id'], name='order_org_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(fields=['organization', 'updated_at', 'id'], name='variant_org_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='catalogimport',
+            index=models.Index(fields=['organization', 'created_at'], name='import_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['organization', 'status', 'ordered_date'], name='order_org_status_ordered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['organization', 'status', 'completed_date'], name='order_org_status_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['assigned_to', 'status'], name='order_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(fields=['organization', 'sku'], name='variant_org_sku_idx'),
+        ),
+    ]
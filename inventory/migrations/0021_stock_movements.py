@@ -0,0 +1,79 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+import django.utils.timezone
+
+
+def open_journal(apps, schema_editor):
+    # Existing stock becomes one opening movement per variant, so the journal
+    # explains every quantity from the start.
+    Variant = apps.get_model("inventory", "Variant")
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    now = timezone.now()
+    variants = Variant.objects.exclude(quantity=0).values_list(
+        "id", "quantity", "organization_id"
+    )
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                variant_id=variant_id,
+                quantity=quantity,
+                reason="ADJUST",
+                organization_id=organization_id,
+                created_at=now,
+            )
+            for variant_id, quantity, organization_id in variants.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_customer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0020_tenant_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(choices=[('RESERVE', 'Order reserve'), ('RELEASE', 'Order release'), ('ADJUST', 'Manual adjust'), ('IMPORT', 'Import')], max_length=7)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.order')),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='user.organization')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.variant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('movement', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='inventory.stockmovement')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.variant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['variant', 'movement'], name='snapshot_variant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['variant', 'created_at', 'id'], name='movement_variant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['organization', 'created_at'], name='movement_org_idx'),
+        ),
+        migrations.RunPython(open_journal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:13
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    Product = apps.get_model("inventory", "Product")
+    Product.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_stock_movements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['organization', 'updated_at', 'id'], name='product_org_updated_idx'),
+        ),
+    ]
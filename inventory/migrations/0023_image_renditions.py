@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0022_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variant',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
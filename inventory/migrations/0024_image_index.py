@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0023_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='variant',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, upload_to='variant_images'),
+        ),
+    ]
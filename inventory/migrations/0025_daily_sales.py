@@ -0,0 +1,125 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:37
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+import django.db.models.deletion
+
+CHUNK_SIZE = 2000
+
+
+def backfill_unit_price(apps, schema_editor):
+    # The price at the time is gone, the current one is the best guess.
+    OrderItem = apps.get_model("inventory", "OrderItem")
+    Variant = apps.get_model("inventory", "Variant")
+    OrderItem.objects.filter(product__isnull=False).update(
+        unit_price=Subquery(
+            Variant.objects.filter(pk=OuterRef("product_id")).values("price")[:1]
+        )
+    )
+
+
+
+def backfill_daily_sales(apps, schema_editor):
+    # inventory.services.earning.rebuild_sales against the historical
+    # models: completed orders a chunk at a time, each chunk added to the
+    # rows earlier chunks created.
+    Order = apps.get_model("inventory", "Order")
+    OrderItem = apps.get_model("inventory", "OrderItem")
+    DailySales = apps.get_model("inventory", "DailySales")
+
+    orders = Order.objects.filter(
+        completed_date__isnull=False, organization__isnull=False
+    )
+    last_id = 0
+    while True:
+        ids = list(
+            orders.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        lines = (
+            OrderItem.objects.filter(order__in=ids, product__isnull=False)
+            .annotate(day=TruncDate("order__completed_date"))
+            .values("order__organization_id", "product_id", "day")
+            .annotate(
+                sold=Sum("quantity"),
+                total=Sum(
+                    F("quantity") * Coalesce("unit_price", "product__price"),
+                    output_field=models.DecimalField(max_digits=14, decimal_places=2),
+                ),
+            )
+            .order_by()
+        )
+        changes = {
+            (line["order__organization_id"], line["product_id"], line["day"]): (
+                line["sold"],
+                line["total"],
+            )
+            for line in lines
+        }
+        if not changes:
+            continue
+        DailySales.objects.bulk_create(
+            [
+                DailySales(
+                    organization_id=organization_id, variant_id=variant_id, date=date
+                )
+                for organization_id, variant_id, date in changes
+            ],
+            ignore_conflicts=True,
+        )
+        rows = DailySales.objects.filter(
+            organization_id__in={key[0] for key in changes},
+            variant_id__in={key[1] for key in changes},
+            date__in={key[2] for key in changes},
+        ).only("organization_id", "variant_id", "date")
+        updated = []
+        for row in rows:
+            change = changes.get((row.organization_id, row.variant_id, row.date))
+            if change is None:
+                continue
+            row.quantity = F("quantity") + change[0]
+            row.revenue = F("revenue") + change[1]
+            updated.append(row)
+        DailySales.objects.bulk_update(updated, ["quantity", "revenue"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_avatar_index'),
+        ('inventory', '0024_image_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_unit_price, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.organization')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.variant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailysales',
+            index=models.Index(fields=['organization', 'date'], name='sales_org_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysales',
+            unique_together={('organization', 'variant', 'date')},
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0025_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='varientfield',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
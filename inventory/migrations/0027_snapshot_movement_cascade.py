@@ -0,0 +1,19 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0026_variant_field_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stocksnapshot',
+            name='movement',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='inventory.stockmovement'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0027_snapshot_movement_cascade'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='catalogimport',
+            name='file',
+            field=models.FileField(db_index=True, upload_to='catalog_imports'),
+        ),
+    ]
@@ -1,6 +1,10 @@
+from decimal import Decimal
 from email.policy import default
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from user.models import Customer, User
 
 
@@ -16,6 +20,7 @@ class VarientField(models.Model):
         VariantFieldName, null=True, blank=True, on_delete=models.CASCADE
     )
     value = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
 
     organization = models.ForeignKey(
         "user.Organization", on_delete=models.CASCADE, null=True, blank=True
@@ -31,32 +36,75 @@ class Variant(models.Model):
     product = models.ForeignKey(
         "Product", on_delete=models.SET_NULL, blank=True, null=True
     )
-    image = models.ImageField(upload_to="variant_images", blank=True)
+    # Indexed to count the references to shared files, see merak.storage.
+    image = models.ImageField(upload_to="variant_images", blank=True, db_index=True)
+    # {"source": image name, "thumb": name, "medium": name}, written by
+    # inventory.tasks.generate_renditions_task.
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     quantity = models.IntegerField(default=0)
     sku = models.CharField(max_length=100, blank=True)
     is_default = models.BooleanField(default=False)
     is_active = models.BooleanField(default=False)
     taxable = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bulk UPDATEs (stock reservations) set this themselves, auto_now only
+    # covers save().
+    updated_at = models.DateTimeField(auto_now=True)
 
     organization = models.ForeignKey(
         "user.Organization", on_delete=models.CASCADE, null=True, blank=True
     )
 
+    class Meta:
+        indexes = [
+            # Keyset for cursor pagination, see merak.pagination.
+            models.Index(
+                fields=["organization", "created_at", "id"],
+                name="variant_org_created_idx",
+            ),
+            # Incremental exports, see inventory.services.export.
+            models.Index(
+                fields=["organization", "updated_at", "id"],
+                name="variant_org_updated_idx",
+            ),
+            # VariantView looks variants up by sku within the organization.
+            models.Index(fields=["organization", "sku"], name="variant_org_sku_idx"),
+        ]
+        constraints = [
+            # Empty skus are left alone so rows created before a sku is
+            # assigned don't clash with each other.
+            models.UniqueConstraint(
+                fields=["sku"], condition=~models.Q(sku=""), name="unique_variant_sku"
+            )
+        ]
+
     def __str__(self):
         return self.sku if self.sku else str(self.id)
 
-    def set_sku(self):
-        self.sku = self.product.name + "-"
-        fields = [field.value for field in self.field.all()]
-        self.sku += "-".join(map(str, fields))
-        while Variant.objects.filter(sku=self.sku).exists():
-            self.sku += str(uuid.uuid4())[:5]
-        self.save()
-    
-    # def save(self, *args, **kwargs):
-    #     super().save(*args, **kwargs)
-    #     if not self.sku:
-    #         self.set_sku()
+
+class VariantSearchTerm(models.Model):
+    """Prefixes of every word of a variant's sku, product name and field values.
+
+    Searching is then an indexed equality lookup on ``term`` instead of a
+    LIKE scan over the variant table. Kept in sync by inventory.signals.
+    """
+
+    variant = models.ForeignKey(
+        Variant, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    term = models.CharField(max_length=32)
+    # The term is a whole word rather than just a prefix of one.
+    is_word = models.BooleanField(default=False)
+    organization = models.ForeignKey(
+        "user.Organization", on_delete=models.CASCADE, null=True, blank=True
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["term", "variant"])]
+
+    def __str__(self):
+        return self.term
+
 
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -69,6 +117,21 @@ class Product(models.Model):
     organization = models.ForeignKey(
         "user.Organization", on_delete=models.CASCADE, null=True, blank=True
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "created_at", "id"],
+                name="product_org_created_idx",
+            ),
+            # List ETags, see merak.conditional.
+            models.Index(
+                fields=["organization", "updated_at", "id"],
+                name="product_org_updated_idx",
+            ),
+        ]
 
     def __str__(self):
         if self.name:
@@ -76,26 +139,30 @@ class Product(models.Model):
         else:
             return self.uuid
 
+    def _get_default_variant_value(self, name):
+        # Annotated by inventory.services.product.with_default_variant.
+        annotation = "default_variant_" + name
+        if annotation not in self.__dict__:
+            setattr(
+                self,
+                annotation,
+                self.variant_set.filter(is_default=True)
+                .order_by("pk")
+                .values_list(name, flat=True)
+                .first(),
+            )
+        return getattr(self, annotation)
+
     @property
     def default_image(self):
-        variants = self.variant_set.all()
-        for variant in variants:
-            if variant.is_default:
-                try:
-                    return variant.image.url
-                except ValueError:
-                    return None
-        return None
+        image = self._get_default_variant_value("image")
+        if not image:
+            return None
+        return Variant._meta.get_field("image").storage.url(image)
 
     @property
     def default_price(self):
-        variants = self.variant_set.all()
-        for variant in variants:
-            if variant.is_default:
-                try:
-                    return variant.price
-                except ValueError:
-                    return None
+        return self._get_default_variant_value("price")
 
     def save(self, *args, **kwargs):
         # generate uuid
@@ -109,6 +176,11 @@ class OrderItem(models.Model):
         Variant, on_delete=models.PROTECT, blank=True, null=True
     )
     quantity = models.IntegerField(default=0)
+    # The variant's price when the order totals were last calculated, so
+    # sales figures don't move when a price changes later.
+    unit_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
 
     organization = models.ForeignKey(
         "user.Organization", on_delete=models.CASCADE, null=True, blank=True
@@ -127,6 +199,9 @@ class OrderItem(models.Model):
         super().save(*args, **kwargs)
 
 
+TAX_RATE = Decimal("0.13")
+
+
 # Status Enum
 class Status(models.TextChoices):
     PENDING = "PENDING", "Pending"
@@ -166,22 +241,52 @@ class Order(models.Model):
 
     ordered_date = models.DateTimeField(auto_now_add=True)
     completed_date = models.DateTimeField(blank=True, null=True)
-
-    @property
-    def total(self):
-        return sum([item.price for item in self.items.all()])
-
-    def get_pending_orders(self):
-        return Order.objects.filter(status=Status.PENDING)
-
-    def get_estimated_earning(self):
-        return sum([order.total for order in self.get_pending_orders()])
-
-    def get_completed_orders(self):
-        return Order.objects.filter(status=Status.COMPLETED)
-
-    def get_total_earning(self):
-        return sum([order.total for order in self.get_total_orders()])
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Kept up to date whenever the items change, see calculate_totals.
+    sub_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "ordered_date", "id"],
+                name="order_org_ordered_idx",
+            ),
+            models.Index(
+                fields=["organization", "updated_at", "id"],
+                name="order_org_updated_idx",
+            ),
+            models.Index(
+                fields=["organization", "status", "ordered_date"],
+                name="order_org_status_ordered_idx",
+            ),
+            # Earnings per staff member over completed orders.
+            models.Index(
+                fields=["organization", "status", "completed_date"],
+                name="order_org_status_done_idx",
+            ),
+            # The pending and accepted lists of a staff member.
+            models.Index(
+                fields=["assigned_to", "status"], name="order_assignee_status_idx"
+            ),
+        ]
+
+    def calculate_totals(self, items):
+        """Set sub_total, tax and total from ``items`` (OrderItems with their
+        variant loaded), and the unit_price of every item. Only taxable
+        variants are taxed."""
+        sub_total = taxable = Decimal("0")
+        for item in items:
+            item.unit_price = item.product.price
+            line_total = item.product.price * item.quantity
+            sub_total += line_total
+            if item.product.taxable:
+                taxable += line_total
+        self.sub_total = sub_total
+        self.tax = (taxable * TAX_RATE).quantize(Decimal("0.01"))
+        self.total = self.sub_total + self.tax
 
     def __str__(self):
         return self.assigned_to.email if self.assigned_to else ""
@@ -194,4 +299,264 @@ class Order(models.Model):
         # generate uuid
         if not self.uuid:
             self.uuid = uuid.uuid4()
-        super().save(*args, **kwargs)
+
+        # completed_date doubles as the marker that the order was counted in
+        # DailyRevenue and DailySales, so completing and reopening adjust the
+        # rollups once.
+        completing = self.status == Status.COMPLETED and self.completed_date is None
+        reopening = self.status != Status.COMPLETED and self.completed_date is not None
+        if (completing or reopening) and kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "completed_date"}
+
+        with transaction.atomic():
+            if reopening:
+                DailyRevenue.record(self, -1)
+                DailySales.record([self], timezone.localdate(self.completed_date), -1)
+                self.completed_date = None
+            if completing:
+                self.completed_date = timezone.now()
+            super().save(*args, **kwargs)
+            if completing:
+                DailyRevenue.record(self, 1)
+                DailySales.record([self], timezone.localdate(self.completed_date), 1)
+
+
+class DailyRevenue(models.Model):
+    """Completed orders and their revenue per organization and day.
+
+    Maintained as orders complete so dashboards never scan the order history.
+    """
+
+    organization = models.ForeignKey("user.Organization", on_delete=models.CASCADE)
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("organization", "date")
+
+    def __str__(self):
+        return f"{self.organization} - {self.date}"
+
+    @classmethod
+    def record(cls, order, sign):
+        """Add (``sign=1``) or remove (``sign=-1``) a completed order."""
+        if order.organization_id is None:
+            return
+        cls.add(
+            order.organization_id,
+            timezone.localdate(order.completed_date),
+            sign,
+            sign * order.total,
+        )
+
+    @classmethod
+    def add(cls, organization_id, date, orders, revenue):
+        rollup = cls.objects.filter(organization_id=organization_id, date=date)
+        changes = dict(orders=F("orders") + orders, revenue=F("revenue") + revenue)
+        if rollup.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    organization_id=organization_id,
+                    date=date,
+                    orders=orders,
+                    revenue=revenue,
+                )
+        except IntegrityError:
+            # Somebody created the row for this day first.
+            rollup.update(**changes)
+
+
+class DailySales(models.Model):
+    """Units sold and revenue (before tax) per variant and day.
+
+    Maintained from the lines of orders as they complete or are reopened,
+    like DailyRevenue, so sales analytics never walk the order items.
+    rebuild_sales recomputes it from the order history.
+    """
+
+    organization = models.ForeignKey("user.Organization", on_delete=models.CASCADE)
+    variant = models.ForeignKey(Variant, on_delete=models.CASCADE)
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("organization", "variant", "date")
+        indexes = [
+            # The best sellers of an organization over a range of days.
+            models.Index(fields=["organization", "date"], name="sales_org_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.variant} - {self.date}"
+
+    @staticmethod
+    def totals(items, *fields):
+        """Units (``sold``) and revenue (``total``) of the OrderItems
+        ``items``, per organization, variant and ``fields``."""
+        return (
+            items.filter(order__organization__isnull=False, product__isnull=False)
+            .values("order__organization_id", "product_id", *fields)
+            .annotate(
+                sold=Sum("quantity"),
+                # Lines priced before unit_price existed use today's price.
+                total=Sum(
+                    F("quantity") * Coalesce("unit_price", "product__price"),
+                    output_field=models.DecimalField(max_digits=14, decimal_places=2),
+                ),
+            )
+            .order_by()
+        )
+
+    @classmethod
+    def record(cls, orders, date, sign):
+        """Add (``sign=1``) or remove (``sign=-1``) the lines of ``orders``,
+        all completed on ``date``."""
+        lines = cls.totals(OrderItem.objects.filter(order__in=orders))
+        cls.add(
+            {
+                (line["order__organization_id"], line["product_id"], date): (
+                    sign * line["sold"],
+                    sign * line["total"],
+                )
+                for line in lines
+            }
+        )
+
+    @classmethod
+    def add(cls, changes):
+        """Apply ``{(organization_id, variant_id, date): (quantity, revenue)}``
+        with three queries however many rows it touches."""
+        if not changes:
+            return
+        # Concurrent completions may create the same rows, hence the
+        # conflicts are ignored and the amounts added with F() afterwards.
+        cls.objects.bulk_create(
+            [
+                cls(organization_id=organization_id, variant_id=variant_id, date=date)
+                for organization_id, variant_id, date in changes
+            ],
+            ignore_conflicts=True,
+        )
+        rows = cls.objects.filter(
+            organization_id__in={key[0] for key in changes},
+            variant_id__in={key[1] for key in changes},
+            date__in={key[2] for key in changes},
+        ).only("organization_id", "variant_id", "date")
+        updated = []
+        for row in rows:
+            change = changes.get((row.organization_id, row.variant_id, row.date))
+            if change is None:
+                continue
+            row.quantity = F("quantity") + change[0]
+            row.revenue = F("revenue") + change[1]
+            updated.append(row)
+        cls.objects.bulk_update(updated, ["quantity", "revenue"])
+
+
+class CatalogImport(models.Model):
+    """A catalog file uploaded for inventory.tasks.import_catalog_task."""
+
+    class ImportStatus(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        COMPLETED = "COMPLETED", "Completed"
+        FAILED = "FAILED", "Failed"
+
+    # Indexed to count the references to shared files, see merak.files.
+    file = models.FileField(upload_to="catalog_imports", db_index=True)
+    format = models.CharField(max_length=5, choices=[("csv", "CSV"), ("jsonl", "JSON lines")])
+    status = models.CharField(
+        max_length=10, choices=ImportStatus.choices, default=ImportStatus.PENDING
+    )
+    # Counts reported by the importer after every batch.
+    stats = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    organization = models.ForeignKey(
+        "user.Organization", on_delete=models.CASCADE, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "created_at"], name="import_org_created_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.file.name} ({self.status})"
+
+
+class StockMovement(models.Model):
+    """One change to a variant's stock. Rows are only ever added.
+
+    Written in the same transaction as the change to ``Variant.quantity``,
+    so the journal always explains the current quantity.
+    """
+
+    class Reason(models.TextChoices):
+        RESERVE = "RESERVE", "Order reserve"
+        RELEASE = "RELEASE", "Order release"
+        ADJUST = "ADJUST", "Manual adjust"
+        IMPORT = "IMPORT", "Import"
+
+    variant = models.ForeignKey(
+        Variant, on_delete=models.CASCADE, related_name="movements"
+    )
+    # Signed, negative quantities take stock out.
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=7, choices=Reason.choices)
+    order = models.ForeignKey(
+        Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    organization = models.ForeignKey(
+        "user.Organization", on_delete=models.CASCADE, null=True, blank=True
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["variant", "created_at", "id"], name="movement_variant_idx"
+            ),
+            models.Index(
+                fields=["organization", "created_at"], name="movement_org_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.variant_id} {self.quantity:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """A variant's stock once every movement up to ``movement`` is applied.
+
+    Stock at any moment is the last snapshot before it plus the movements
+    after that snapshot, see inventory.services.stock.stock_at.
+    """
+
+    variant = models.ForeignKey(
+        Variant, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    quantity = models.IntegerField()
+    # The last movement included in ``quantity``.
+    movement = models.ForeignKey(
+        StockMovement, on_delete=models.CASCADE, related_name="+"
+    )
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["variant", "movement"], name="snapshot_variant_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.variant_id} = {self.quantity} at {self.taken_at}"
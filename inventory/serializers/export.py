@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from inventory.services.export import FORMATS
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    # Not ?format=, DRF reserves that one for picking a renderer.
+    output = serializers.ChoiceField(choices=FORMATS, default="ndjson")
+    since = serializers.DateTimeField(required=False)
@@ -1,33 +1,37 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
-from inventory.models import Order, OrderItem, Variant
+from inventory.models import Order, Variant
 from inventory.serializers.product import ItemsRetriveSerializer, VariantSerializer
 from inventory.serializers.user import CustomerOutSerializer, UserOutSerializer
+from inventory.services.order import (
+    create_order,
+    get_customer,
+    get_staff,
+    update_order_items,
+)
+from inventory.services.transition import ACTIONS, MAX_BATCH_SIZE
+from merak.sparse import SparseFieldsSerializerMixin
 from user.models import Customer
 
 user_model = get_user_model()
 
 
-class OrderOutSerializer(serializers.ModelSerializer):
+class OrderOutSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     ordered_by = CustomerOutSerializer(read_only=True)
     assigned_to = UserOutSerializer(read_only=True)
     items = ItemsRetriveSerializer(many=True)
     invoice = serializers.CharField(source="uuid")
-    sub_total = serializers.SerializerMethodField()
-    total = serializers.SerializerMethodField()
-
-    # Need refactoring--------------------------------------------------
-    def get_sub_total(self, obj):
-        sub_total = 0
-        for item in obj.items.all():
-            sub_total += item.product.price * item.quantity
-        return float(sub_total)
-
-    # Need refactoring--------------------------------------------------
-    def get_total(self, obj):
-        tax = 1.13
-        return self.get_sub_total(obj) * tax
+    sub_total = serializers.DecimalField(
+        max_digits=12, decimal_places=2, coerce_to_string=False, read_only=True
+    )
+    tax = serializers.DecimalField(
+        max_digits=12, decimal_places=2, coerce_to_string=False, read_only=True
+    )
+    total = serializers.DecimalField(
+        max_digits=12, decimal_places=2, coerce_to_string=False, read_only=True
+    )
 
     class Meta:
         model = Order
@@ -40,6 +44,7 @@ class OrderOutSerializer(serializers.ModelSerializer):
             "ordered_date",
             "completed_date",
             "sub_total",
+            "tax",
             "total",
         )
 
@@ -50,116 +55,66 @@ class OrderInSerializer(serializers.Serializer):
         assigned_to = serializers.IntegerField(required=False)
 
         def create(self, validated_data):
-            order_item_list = []
-            for item in validated_data.pop("items"):
-                try:
-                    product = Variant.objects.get(
-                        sku=item["product"],
-                        organization=self.context["request"].user.organization,
-                    )
-                except Variant.DoesNotExist:
-                    raise serializers.ValidationError(
-                        "Product with sku {} does not exist".format(item["product"])
-                    )
-
-                if product.quantity < item["quantity"]:
-                    raise serializers.ValidationError(
-                        "Not enough quantity for product {}".format(
-                            product.product.name
-                        )
-                    )
-                product.quantity -= item["quantity"]
-                product.save()
-
-                order_item = OrderItem.objects.create(
-                    product=product,
-                    quantity=item["quantity"],
-                    organization=product.organization,
-                )
-
-                order_item_list.append(order_item)
-            try:
-                ordered_by = Customer.objects.get(
-                    id=validated_data.pop("ordered_by"),
-                    organization=self.context["request"].user.organization,
-                )
-            except user_model.DoesNotExist:
-                raise serializers.ValidationError("User does not exist")
-            try:
-                assigned_to = user_model.objects.get(
-                    id=validated_data.pop("assigned_to"),
-                    organization=ordered_by.organization,
-                )
-            except KeyError:
-                assigned_to = None
-            except user_model.DoesNotExist:
-                raise serializers.ValidationError("User does not exist")
-            order = Order.objects.create(
-                owned_by=self.context["request"].user,
-                organization=self.context["request"].user.organization,
-                ordered_by=ordered_by,
-                assigned_to=assigned_to,
+            return create_order(
+                self.context["request"].user,
+                validated_data.pop("items"),
+                validated_data.pop("ordered_by"),
+                validated_data.pop("assigned_to", None),
                 **validated_data
             )
-            order.items.set(order_item_list)
-            return order
 
         def update(self, instance, validated_data):
-            order_item_list = []
-            try:
-                for item in validated_data.pop("items"):
-                    product = Variant.objects.get(id=item["product"])
-                    product.quantity -= item["quantity"]
-                    product.save()
-                    order_item = OrderItem.objects.create(
-                        product=product, quantity=item["quantity"]
+            items = validated_data.pop("items", None)
+            request = self.context.get("request")
+            user = request.user if request else None
+            organization = instance.organization
+            with transaction.atomic():
+                if items is not None:
+                    update_order_items(instance, items, user=user)
+                if "ordered_by" in validated_data:
+                    instance.ordered_by = get_customer(
+                        validated_data.pop("ordered_by"), organization
+                    )
+                if "assigned_to" in validated_data:
+                    instance.assigned_to = get_staff(
+                        validated_data.pop("assigned_to"), organization
                     )
+                for field, value in validated_data.items():
+                    setattr(instance, field, value)
+                instance.save()
+            return instance
 
-                    order_item_list.append(order_item)
 
-                for previous_item in instance.items.all():
-                    previous_item.product.quantity += previous_item.quantity
-                    previous_item.product.save()
+class EarningQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=("day", "week", "month"), default="day")
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
 
-                instance.items.all().delete()
-                instance.items.set(order_item_list)
-            except KeyError:
-                pass
 
-            instance.__dict__.update(validated_data)
-            instance.save()
-            return instance
+class SalesQuerySerializer(EarningQuerySerializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
 
-class OrderOutSerializer(serializers.ModelSerializer):
-    ordered_by = CustomerOutSerializer(read_only=True)
-    assigned_to = UserOutSerializer(read_only=True)
-    items = ItemsRetriveSerializer(many=True)
-    invoice = serializers.CharField(source="uuid")
-    sub_total = serializers.SerializerMethodField()
-    total = serializers.SerializerMethodField()
 
-    # Need refactoring--------------------------------------------------
-    def get_sub_total(self, obj):
-        sub_total = 0
-        for item in obj.items.all():
-            sub_total += item.product.price * item.quantity
-        return float(sub_total)
+class OrderTransitionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=ACTIONS)
+    orders = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
 
-    # Need refactoring--------------------------------------------------
-    def get_total(self, obj):
-        tax = 1.13
-        return self.get_sub_total(obj) * tax
 
-    class Meta:
-        model = Order
-        fields = (
-            "ordered_by",
-            "assigned_to",
-            "status",
-            "items",
-            "invoice",
-            "ordered_date",
-            "completed_date",
-            "sub_total",
-            "total",
-        )
+class DispatchSerializer(serializers.Serializer):
+    # {staff_id: [order uuid]}
+    assignments = serializers.DictField(
+        child=serializers.ListField(
+            child=serializers.CharField(max_length=255), max_length=MAX_BATCH_SIZE
+        ),
+        allow_empty=False,
+    )
+
+    def validate_assignments(self, value):
+        try:
+            return {int(staff_id): uuids for staff_id, uuids in value.items()}
+        except ValueError:
+            raise serializers.ValidationError("Staff ids must be integers")
@@ -1,8 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 
 from rest_framework import serializers
 from inventory.models import (
+    CatalogImport,
     Product,
+    StockMovement,
     Variant,
     VariantFieldName,
     VarientField,
@@ -10,14 +13,22 @@ from inventory.models import (
 
 from drf_writable_nested.serializers import WritableNestedModelSerializer
 
+from inventory.services.catalog import guess_format
+from inventory.services.product import MAX_BATCH_SIZE, MAX_MATRIX_SIZE
+from inventory.services.sku import assign_skus, sku_taken
+from inventory.services.stock import record_movements, set_stock
+from merak.fields import RenditionsField
+from merak.sparse import SparseFieldsSerializerMixin
+
 from user.models import Customer
 
 
 user_model = get_user_model()
 
-class FieldSerializer(serializers.ModelSerializer):
+class FieldSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     field_name = serializers.CharField(write_only=True)
     name = serializers.SerializerMethodField(read_only=True)
+    field_lookups = {"name": ("name",)}
 
     class Meta:
         model = VarientField
@@ -42,7 +53,7 @@ class FieldSerializer(serializers.ModelSerializer):
         return obj.name.name
 
 class VariantInSerializer(WritableNestedModelSerializer):
-        field = serializers.ListField()
+        field = serializers.ListField(child=serializers.IntegerField())
         price = serializers.IntegerField()
         image = serializers.ImageField(required=False)
         # image = serializers.CharField(required=False)
@@ -61,17 +72,44 @@ class VariantInSerializer(WritableNestedModelSerializer):
             request = self.context.get("request")
             if request and hasattr(request, "user"):
                 user = request.user
-            variant = Variant.objects.create(
-                **validated_data, organization=user.organization
-            )
-            variant.set_sku()
-            field_obj = [VarientField.objects.get(id=field_id) for field_id in field]
-            variant.field.set(field_obj)
-            variant.save()
+            field_ids = list(field)
+            fields = VarientField.objects.in_bulk(field_ids)
+            if len(fields) != len(set(field_ids)):
+                raise serializers.ValidationError("Variant field does not exist")
+            field_obj = [fields[field_id] for field_id in field_ids]
+            variant = Variant(**validated_data, organization=user.organization)
+            assign_skus([variant], [field_obj])
+            try:
+                with transaction.atomic():
+                    variant.save()
+                    variant.field.set(field_obj)
+                    record_movements(
+                        {variant.id: variant.quantity},
+                        StockMovement.Reason.ADJUST,
+                        user=user,
+                    )
+            except IntegrityError as error:
+                raise sku_taken(error, variant.sku)
             return variant
 
-class VairantOutSerializer(serializers.ModelSerializer):
+        def update(self, instance, validated_data):
+            # Stock changes go through the journal rather than a plain save.
+            quantity = validated_data.pop("quantity", None)
+            request = self.context.get("request")
+            try:
+                with transaction.atomic():
+                    instance = super().update(instance, validated_data)
+                    if quantity is not None:
+                        set_stock(
+                            instance, quantity, user=request.user if request else None
+                        )
+            except IntegrityError as error:
+                raise sku_taken(error, validated_data.get("sku", instance.sku))
+            return instance
+
+class VairantOutSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     field = FieldSerializer(many=True)
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Variant
@@ -99,7 +137,13 @@ class ProductInSerializer(serializers.ModelSerializer):
         product.save()
         return product
 
-class ProductOutSerializer(serializers.ModelSerializer):
+class ProductOutSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    # Annotated by inventory.services.product.with_default_variant.
+    field_lookups = {
+        "default_image": ("default_variant_image",),
+        "default_price": ("default_variant_price",),
+    }
+
     class Meta:
         model = Product
         fields = (
@@ -116,23 +160,100 @@ class VariantSerializer(serializers.Serializer):
     quantity = serializers.IntegerField()
 
 
-class ItemsRetriveSerializer(serializers.Serializer):
+class ItemsRetriveSerializer(SparseFieldsSerializerMixin, serializers.Serializer):
     product = VairantOutSerializer()
     quantity = serializers.IntegerField()
     line_total = serializers.SerializerMethodField()
+    field_lookups = {"line_total": ("product",)}
 
     def get_line_total(self, obj):
-        return obj.product.price * obj.quantity
+        # Lines priced before unit_price existed use today's price.
+        price = obj.unit_price if obj.unit_price is not None else obj.product.price
+        return price * obj.quantity
 
-class VariantSerializer(serializers.Serializer):
-    product = serializers.CharField()
-    quantity = serializers.IntegerField()
 
+class CatalogImportSerializer(serializers.ModelSerializer):
+    format = serializers.ChoiceField(
+        choices=CatalogImport._meta.get_field("format").choices, required=False
+    )
+
+    class Meta:
+        model = CatalogImport
+        fields = ("id", "file", "format", "status", "stats", "created_at", "finished_at")
+        read_only_fields = ("status", "stats", "created_at", "finished_at")
 
-class ItemsRetriveSerializer(serializers.Serializer):
-    product = VairantOutSerializer()
+    def create(self, validated_data):
+        user = self.context["request"].user
+        validated_data.setdefault("format", guess_format(validated_data["file"].name))
+        return CatalogImport.objects.create(
+            created_by=user, organization=user.organization, **validated_data
+        )
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    order = serializers.SlugRelatedField(slug_field="uuid", read_only=True)
+
+    class Meta:
+        model = StockMovement
+        fields = ("id", "quantity", "reason", "order", "created_by", "created_at")
+
+
+class StockMovementQuerySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+
+class StockAdjustSerializer(serializers.Serializer):
+    # Signed, negative quantities take stock out.
     quantity = serializers.IntegerField()
-    line_total = serializers.SerializerMethodField()
 
-    def get_line_total(self, obj):
-        return obj.product.price * obj.quantity
+
+class VariantRowSerializer(serializers.Serializer):
+    field = serializers.ListField(child=serializers.IntegerField())
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField(min_value=0, default=0)
+    sku = serializers.CharField(max_length=100, required=False)
+    is_default = serializers.BooleanField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    taxable = serializers.BooleanField(required=False)
+
+
+class VariantBatchSerializer(serializers.Serializer):
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
+    variants = serializers.ListField(
+        child=VariantRowSerializer(), allow_empty=False, max_length=MAX_BATCH_SIZE
+    )
+
+    def validate_product(self, product):
+        if product.organization_id != self.context["request"].user.organization_id:
+            raise serializers.ValidationError("Product does not exist")
+        return product
+
+
+class VariantMatrixSerializer(serializers.Serializer):
+    # {field name: [value]}, e.g. {"size": ["s", "m"], "color": ["red"]}
+    axes = serializers.DictField(
+        child=serializers.ListField(
+            child=serializers.CharField(max_length=100), allow_empty=False
+        ),
+        allow_empty=False,
+    )
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField(min_value=0, default=0)
+
+    def validate_axes(self, axes):
+        axes = {
+            name.strip(): list(dict.fromkeys(value.strip() for value in values))
+            for name, values in axes.items()
+        }
+        size = 1
+        for values in axes.values():
+            size *= len(values)
+        if size > MAX_MATRIX_SIZE:
+            raise serializers.ValidationError(
+                "{} combinations, at most {} can be generated at once".format(
+                    size, MAX_MATRIX_SIZE
+                )
+            )
+        return axes
+
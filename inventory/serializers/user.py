@@ -2,11 +2,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from merak.sparse import SparseFieldsSerializerMixin
 from user.models import Customer
 
 user_model = get_user_model()
 
-class UserOutSerializer(serializers.ModelSerializer):
+class UserOutSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -17,7 +18,7 @@ class UserOutSerializer(serializers.ModelSerializer):
         return obj.get_full_name()
 
 
-class CustomerOutSerializer(serializers.ModelSerializer):
+class CustomerOutSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = "__all__"
\ No newline at end of file
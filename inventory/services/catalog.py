@@ -0,0 +1,282 @@
+import csv
+import io
+import itertools
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from inventory.cache import bump_catalog_version_on_commit
+from inventory.models import (
+    Product,
+    StockMovement,
+    Variant,
+    VariantFieldName,
+    VarientField,
+)
+from inventory.services.search import index_variants
+from inventory.services.sku import assign_skus
+from inventory.services.stock import record_movements
+from inventory.utils import bulk_create_returning_pks
+
+FORMATS = ("csv", "jsonl")
+BATCH_SIZE = 1000
+# Only the first errors are kept so a bad file can't grow the report forever.
+MAX_REPORTED_ERRORS = 100
+
+VARIANT_COLUMNS = ("price", "quantity", "sku", "is_default", "taxable")
+PRODUCT_COLUMNS = ("product", "description")
+
+
+def guess_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+def read_rows(stream, format):
+    """Yield ``(line, row)`` from a binary CSV or JSON lines stream, one at a time.
+
+    Columns other than the product and variant columns are variant fields,
+    e.g. ``color,size``. JSON lines may also nest them under ``"fields"``.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line, data in enumerate(text, start=1):
+            if not data.strip():
+                continue
+            try:
+                row = json.loads(data)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                row = {"error": "Line is not a JSON object"}
+            yield line, row
+
+
+def _parse_bool(value, default):
+    if value in (None, ""):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def parse_row(row):
+    """Turn a raw row into product and variant values, raising ValueError."""
+    if "error" in row:
+        raise ValueError(row["error"])
+    name = (row.get("product") or "").strip()
+    if not name:
+        raise ValueError("product is required")
+    try:
+        price = Decimal(str(row.get("price")))
+        quantity = int(row.get("quantity") or 0)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError("price and quantity must be numbers")
+
+    fields = dict(row.get("fields") or {})
+    for key, value in row.items():
+        if key not in VARIANT_COLUMNS + PRODUCT_COLUMNS + ("fields",):
+            fields[key] = value
+    fields = {
+        str(key).strip(): str(value).strip()
+        for key, value in fields.items()
+        if key and value not in (None, "")
+    }
+    return {
+        "product": name,
+        "description": row.get("description") or None,
+        "price": price,
+        "quantity": quantity,
+        "sku": (row.get("sku") or "").strip(),
+        "is_default": _parse_bool(row.get("is_default"), False),
+        "taxable": _parse_bool(row.get("taxable"), True),
+        "fields": fields,
+    }
+
+
+class CatalogImporter:
+    """Create products and variants from rows in batches of ``batch_size``.
+
+    Each batch costs a fixed number of queries: the products and fields it
+    names are looked up and created in bulk, skus are assigned in bulk and
+    the variants, their fields and their search terms are bulk inserted.
+    Variant fields are cached for the whole import, everything else only
+    lives as long as its batch.
+    """
+
+    def __init__(self, user, batch_size=BATCH_SIZE, progress=None):
+        self.user = user
+        self.organization = user.organization
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = {
+            "rows": 0,
+            "products": 0,
+            "variants": 0,
+            "skipped": 0,
+            "failed": 0,
+            "errors": [],
+        }
+        self.field_names = dict(VariantFieldName.objects.values_list("name", "id"))
+        self.fields = {
+            (name_id, value): field_id
+            for field_id, name_id, value in VarientField.objects.filter(
+                organization=self.organization
+            ).values_list("id", "name_id", "value")
+        }
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            if self.progress:
+                self.progress(self.stats)
+        return self.stats
+
+    def error(self, line, message):
+        self.stats["failed"] += 1
+        if len(self.stats["errors"]) < MAX_REPORTED_ERRORS:
+            self.stats["errors"].append({"line": line, "error": message})
+
+    def import_batch(self, batch):
+        self.stats["rows"] += len(batch)
+        parsed = []
+        for line, row in batch:
+            try:
+                parsed.append(parse_row(row))
+            except ValueError as error:
+                self.error(line, str(error))
+
+        # Rows whose sku is already taken were imported before, skip them so
+        # an interrupted import can simply be run again.
+        skus = [row["sku"] for row in parsed if row["sku"]]
+        taken = set(
+            Variant.objects.filter(sku__in=skus).values_list("sku", flat=True)
+        )
+        rows = []
+        for row in parsed:
+            if row["sku"] and row["sku"] in taken:
+                self.stats["skipped"] += 1
+                continue
+            taken.add(row["sku"])
+            rows.append(row)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            products = self.get_products(rows)
+            fields = self.get_field_ids([row["fields"] for row in rows])
+            variants = [
+                Variant(
+                    product=products[row["product"]],
+                    price=row["price"],
+                    quantity=row["quantity"],
+                    sku=row["sku"],
+                    is_default=row["is_default"],
+                    taxable=row["taxable"],
+                    organization=self.organization,
+                )
+                for row in rows
+            ]
+            field_objects = VarientField.objects.in_bulk(
+                {field_id for ids in fields for field_id in ids}
+            )
+            generated = [i for i, variant in enumerate(variants) if not variant.sku]
+            assign_skus(
+                [variants[i] for i in generated],
+                [[field_objects[field_id] for field_id in fields[i]] for i in generated],
+            )
+
+            variants = bulk_create_returning_pks(Variant, variants)
+            Variant.field.through.objects.bulk_create(
+                [
+                    Variant.field.through(variant_id=variant.id, varientfield_id=field_id)
+                    for variant, ids in zip(variants, fields)
+                    for field_id in ids
+                ],
+                batch_size=self.batch_size,
+            )
+            # bulk_create skips the signals that keep the search index in sync.
+            index_variants([variant.id for variant in variants])
+            record_movements(
+                {variant.id: variant.quantity for variant in variants},
+                StockMovement.Reason.IMPORT,
+                user=self.user,
+            )
+            bump_catalog_version_on_commit(self.organization.id)
+        self.stats["variants"] += len(variants)
+
+    def get_products(self, rows):
+        """``{name: product}`` for the batch, creating the missing products."""
+        names = {row["product"]: row["description"] for row in rows}
+        products = {}
+        for product in Product.objects.filter(
+            organization=self.organization, name__in=names
+        ).order_by("-id"):
+            products[product.name] = product
+
+        missing = [
+            Product(
+                name=name,
+                description=description,
+                uuid=str(uuid.uuid4()),
+                owned_by=self.user,
+                organization=self.organization,
+            )
+            for name, description in names.items()
+            if name not in products
+        ]
+        for product in bulk_create_returning_pks(Product, missing):
+            products[product.name] = product
+        self.stats["products"] += len(missing)
+        return products
+
+    def get_field_ids(self, rows):
+        """VarientField ids of every ``{name: value}`` in ``rows``.
+
+        The names and fields the import hasn't seen yet are bulk inserted,
+        one query each for the whole batch.
+        """
+        names = {
+            name for values in rows for name in values if name not in self.field_names
+        }
+        for name in bulk_create_returning_pks(
+            VariantFieldName, [VariantFieldName(name=name) for name in names]
+        ):
+            self.field_names[name.name] = name.id
+
+        keys = [
+            [(self.field_names[name], value) for name, value in values.items()]
+            for values in rows
+        ]
+        missing = {key for row_keys in keys for key in row_keys} - set(self.fields)
+        for field in bulk_create_returning_pks(
+            VarientField,
+            [
+                VarientField(
+                    name_id=name_id, value=value, organization=self.organization
+                )
+                for name_id, value in missing
+            ],
+        ):
+            self.fields[(field.name_id, field.value)] = field.id
+        return [[self.fields[key] for key in row_keys] for row_keys in keys]
+
+
+def import_catalog(stream, format, user, batch_size=BATCH_SIZE, progress=None):
+    """Import a CSV or JSON lines catalog from a binary stream, see CatalogImporter."""
+    if format not in FORMATS:
+        raise ValueError("Unknown catalog format {}".format(format))
+    importer = CatalogImporter(user, batch_size=batch_size, progress=progress)
+    return importer.run(read_rows(stream, format))
@@ -0,0 +1,78 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from inventory.models import Order, Status
+
+user_model = get_user_model()
+
+
+def dispatch_orders(organization, assignments):
+    """Assign pending orders to staff, ``assignments`` is ``{staff_id: [uuid]}``.
+
+    Staff are checked with one query, the orders are locked with another and
+    each staff member's orders are then assigned with a single UPDATE, all in
+    one transaction. Orders that can't be assigned don't stop the others;
+    they are returned as ``conflicts`` with the reason.
+    """
+    staff_ids = set(assignments)
+    known = set(
+        user_model.objects.filter(
+            id__in=staff_ids, organization=organization
+        ).values_list("id", flat=True)
+    )
+    unknown = staff_ids - known
+    if unknown:
+        raise serializers.ValidationError(
+            "Staff {} do not belong to the organization".format(sorted(unknown))
+        )
+
+    listed = Counter(
+        uuid for uuids in assignments.values() for uuid in dict.fromkeys(uuids)
+    )
+    conflicts = {
+        uuid: "Order is listed for more than one staff member"
+        for uuid, count in listed.items()
+        if count > 1
+    }
+    pending = Order.objects.filter(organization=organization, status=Status.PENDING)
+
+    assigned = {}
+    with transaction.atomic():
+        found = set(
+            pending.select_for_update()
+            .filter(uuid__in=[uuid for uuid in listed if uuid not in conflicts])
+            .values_list("uuid", flat=True)
+        )
+        now = timezone.now()
+        for staff_id, uuids in assignments.items():
+            uuids = [uuid for uuid in dict.fromkeys(uuids) if uuid in found]
+            if uuids:
+                pending.filter(uuid__in=uuids).update(
+                    assigned_to_id=staff_id, updated_at=now
+                )
+                assigned[staff_id] = uuids
+
+    missing = [uuid for uuid in listed if uuid not in found and uuid not in conflicts]
+    statuses = {}
+    if missing:
+        statuses = dict(
+            Order.objects.filter(
+                organization=organization, uuid__in=missing
+            ).values_list("uuid", "status")
+        )
+    for uuid in missing:
+        if uuid in statuses:
+            conflicts[uuid] = "Order is {}".format(statuses[uuid].lower())
+        else:
+            conflicts[uuid] = "Order doesn't exists."
+
+    return {
+        "assigned": assigned,
+        "conflicts": [
+            {"order": uuid, "detail": detail} for uuid, detail in conflicts.items()
+        ],
+    }
@@ -0,0 +1,162 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+
+from inventory.models import DailyRevenue, DailySales, Order, OrderItem, Status, Variant
+
+PERIODS = ("day", "week", "month")
+
+OPEN_STATUSES = (Status.PENDING, Status.ACCEPTED, Status.PROCESSING)
+
+
+def _sum(field, **kwargs):
+    return Coalesce(
+        Sum(field, **kwargs),
+        Value(Decimal("0")),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def get_earning_summary(organization):
+    """Open (estimated) and completed earnings of an organization in one query."""
+    open_orders = Q(status__in=OPEN_STATUSES)
+    completed_orders = Q(status=Status.COMPLETED)
+    summary = Order.objects.filter(organization=organization).aggregate(
+        pending_orders=Count("id", filter=open_orders),
+        pending_total=_sum("total", filter=open_orders),
+        completed_orders=Count("id", filter=completed_orders),
+        completed_total=_sum("total", filter=completed_orders),
+    )
+    return {
+        "pending": {
+            "orders": summary["pending_orders"],
+            "total": summary["pending_total"],
+        },
+        "completed": {
+            "orders": summary["completed_orders"],
+            "total": summary["completed_total"],
+        },
+    }
+
+
+def get_earning_by_period(organization, period, since, until):
+    """Completed earnings grouped by day, week or month, read from the rollup."""
+    return list(
+        DailyRevenue.objects.filter(
+            organization=organization, date__gte=since, date__lte=until
+        )
+        .annotate(period=Trunc("date", period))
+        .values("period")
+        .annotate(orders=Sum("orders"), total=_sum("revenue"))
+        .order_by("period")
+    )
+
+
+def get_earning_by_staff(organization, since, until):
+    """Completed earnings per assigned staff member."""
+    return list(
+        Order.objects.filter(
+            organization=organization,
+            status=Status.COMPLETED,
+            completed_date__date__gte=since,
+            completed_date__date__lte=until,
+        )
+        .values("assigned_to", "assigned_to__email")
+        .annotate(orders=Count("id"), total=_sum("total"))
+        .order_by("-total")
+    )
+
+
+def get_top_variants(organization, since, until, limit=20):
+    """The ``limit`` best selling variants by units, read from DailySales."""
+    rows = list(
+        DailySales.objects.filter(
+            organization=organization, date__gte=since, date__lte=until
+        )
+        .values("variant_id")
+        .annotate(quantity=Sum("quantity"), revenue=_sum("revenue"))
+        .filter(quantity__gt=0)
+        .order_by("-quantity", "-revenue", "variant_id")[:limit]
+    )
+    # Labels for the winners only, not for every row that was summed.
+    variants = Variant.objects.select_related("product").in_bulk(
+        [row["variant_id"] for row in rows]
+    )
+    top = []
+    for row in rows:
+        variant = variants[row.pop("variant_id")]
+        product = variant.product
+        top.append(
+            {
+                "variant": variant.sku,
+                "product": product.uuid if product else None,
+                "name": product.name if product else None,
+                **row,
+            }
+        )
+    return top
+
+
+def get_product_sales(product, period, since, until):
+    """Units and revenue of all variants of ``product`` by day, week or month."""
+    return list(
+        DailySales.objects.filter(
+            organization_id=product.organization_id,
+            variant__product=product,
+            date__gte=since,
+            date__lte=until,
+        )
+        .annotate(period=Trunc("date", period))
+        .values("period")
+        .annotate(quantity=Sum("quantity"), revenue=_sum("revenue"))
+        .order_by("period")
+    )
+
+
+def rebuild_sales(organization=None, chunk_size=2000):
+    """Recompute DailySales from the completed orders, returns how many.
+
+    Orders are read ``chunk_size`` at a time by id and each chunk is folded
+    into the rollup with a few queries, so memory stays flat however long
+    the history is.
+    """
+    # completed_date marks the orders the rollups count, see Order.save.
+    orders = Order.objects.filter(
+        completed_date__isnull=False, organization__isnull=False
+    )
+    sales = DailySales.objects.all()
+    if organization is not None:
+        orders = orders.filter(organization=organization)
+        sales = sales.filter(organization=organization)
+
+    counted = last_id = 0
+    with transaction.atomic():
+        sales.delete()
+        while True:
+            ids = list(
+                orders.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            counted += len(ids)
+            last_id = ids[-1]
+            lines = DailySales.totals(
+                OrderItem.objects.filter(order__in=ids).annotate(
+                    day=TruncDate("order__completed_date")
+                ),
+                "day",
+            )
+            DailySales.add(
+                {
+                    (line["order__organization_id"], line["product_id"], line["day"]): (
+                        line["sold"],
+                        line["total"],
+                    )
+                    for line in lines
+                }
+            )
+    return counted
@@ -0,0 +1,214 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import serializers
+
+from inventory.models import DailyRevenue, DailySales, Order, OrderItem, Variant, VarientField
+from inventory.services.stock import count_quantities, release_stock, reserve_stock
+from inventory.utils import bulk_create_returning_pks
+from user.models import Customer
+
+user_model = get_user_model()
+
+
+def with_order_details(queryset, lookups=None):
+    """Load everything OrderOutSerializer renders in a fixed number of queries.
+
+    ``lookups`` limits that to the relations a sparse response reads, see
+    merak.sparse; None loads all of them.
+    """
+
+    def wanted(lookup):
+        return lookups is None or lookup in lookups
+
+    related = [lookup for lookup in ("ordered_by", "assigned_to") if wanted(lookup)]
+    if related:
+        queryset = queryset.select_related(*related)
+    if not wanted("items"):
+        return queryset
+
+    items = OrderItem.objects.all()
+    if wanted("items__product"):
+        items = items.select_related("product")
+    if wanted("items__product__field"):
+        items = items.prefetch_related(
+            Prefetch(
+                "product__field",
+                queryset=VarientField.objects.select_related("name"),
+            )
+        )
+    return queryset.prefetch_related(Prefetch("items", queryset=items))
+
+
+def get_variants_by_sku(skus, organization):
+    """Fetch every variant of the order in one query, keyed by sku."""
+    variants = Variant.objects.filter(
+        sku__in=set(skus), organization=organization
+    ).select_related("product")
+    variants = {variant.sku: variant for variant in variants}
+
+    missing = [sku for sku in skus if sku not in variants]
+    if missing:
+        raise serializers.ValidationError(
+            "Product with sku {} does not exist".format(missing[0])
+        )
+    return variants
+
+
+def get_customer(customer_id, organization):
+    try:
+        return Customer.objects.get(id=customer_id, organization=organization)
+    except Customer.DoesNotExist:
+        raise serializers.ValidationError("Customer does not exist")
+
+
+def get_staff(user_id, organization):
+    try:
+        return user_model.objects.get(id=user_id, organization=organization)
+    except user_model.DoesNotExist:
+        raise serializers.ValidationError("User does not exist")
+
+
+def create_order(user, items, ordered_by, assigned_to=None, **extra):
+    """Create an order and all of its items in a single transaction.
+
+    ``items`` is a list of ``{"product": <sku>, "quantity": <int>}``. The query
+    count is constant no matter how many lines the order has.
+    """
+    organization = user.organization
+
+    with transaction.atomic():
+        variants = get_variants_by_sku(
+            [item["product"] for item in items], organization
+        )
+
+        ordered_by = get_customer(ordered_by, organization)
+        if assigned_to is not None:
+            assigned_to = get_staff(assigned_to, organization)
+
+        order_items = [
+            OrderItem(
+                product=variants[item["product"]],
+                quantity=item["quantity"],
+                organization=organization,
+            )
+            for item in items
+        ]
+        order = Order(
+            owned_by=user,
+            organization=organization,
+            ordered_by=ordered_by,
+            assigned_to=assigned_to,
+            **extra
+        )
+        order.calculate_totals(order_items)
+        order.save()
+        reserve_stock(
+            count_quantities(
+                (variants[item["product"]].id, item["quantity"]) for item in items
+            ),
+            order=order,
+            user=user,
+        )
+
+        order_items = bulk_create_returning_pks(OrderItem, order_items)
+        Order.items.through.objects.bulk_create(
+            [
+                Order.items.through(order=order, orderitem=order_item)
+                for order_item in order_items
+            ]
+        )
+        if order.completed_date:
+            # Order.save counted it before it had any lines.
+            DailySales.record([order], timezone.localdate(order.completed_date), 1)
+    return order
+
+
+def update_order_items(order, items, user=None):
+    """Replace the lines of ``order`` with ``items``, touching only what changed.
+
+    Lines that are still there are kept, lines whose quantity changed are
+    updated, and only new or dropped lines are inserted or deleted, each
+    with one bulk query. Stock moves by the net change per variant, and the
+    revenue and sales of a completed order are recounted. Call it inside a
+    transaction.
+    """
+    organization = order.organization
+    previous_total = order.total
+    if order.completed_date:
+        DailySales.record([order], timezone.localdate(order.completed_date), -1)
+    variants = get_variants_by_sku([item["product"] for item in items], organization)
+    lines = [(variants[item["product"]], item["quantity"]) for item in items]
+
+    previous = {}
+    for order_item in order.items.select_related("product").order_by("id"):
+        previous.setdefault(order_item.product_id, []).append(order_item)
+
+    # Net stock change per variant: new quantities minus the old ones.
+    delta = count_quantities(
+        [(variant.id, quantity) for variant, quantity in lines]
+        + [
+            (order_item.product_id, -order_item.quantity)
+            for rest in previous.values()
+            for order_item in rest
+        ]
+    )
+
+    kept, changed, added = [], [], []
+    # Exact matches first, so reordering lines doesn't count as a change.
+    unmatched = []
+    for variant, quantity in lines:
+        candidates = previous.get(variant.id, [])
+        match = next((i for i in candidates if i.quantity == quantity), None)
+        if match is not None:
+            candidates.remove(match)
+            kept.append(match)
+        else:
+            unmatched.append((variant, quantity))
+    for variant, quantity in unmatched:
+        candidates = previous.get(variant.id, [])
+        if candidates:
+            order_item = candidates.pop(0)
+            order_item.quantity = quantity
+            changed.append(order_item)
+        else:
+            added.append(
+                OrderItem(product=variant, quantity=quantity, organization=organization)
+            )
+    removed = [order_item for rest in previous.values() for order_item in rest]
+
+    release_stock(
+        {variant_id: -n for variant_id, n in delta.items() if n < 0},
+        order=order,
+        user=user,
+    )
+    reserve_stock(
+        {variant_id: n for variant_id, n in delta.items() if n > 0},
+        order=order,
+        user=user,
+    )
+
+    # Kept lines are priced again like the others.
+    changed += [i for i in kept if i.unit_price != i.product.price]
+    kept = [i for i in kept if i.unit_price == i.product.price]
+    order.calculate_totals(kept + changed + added)
+
+    if removed:
+        OrderItem.objects.filter(id__in=[i.id for i in removed]).delete()
+    if changed:
+        OrderItem.objects.bulk_update(changed, ["quantity", "unit_price"])
+    if added:
+        added = bulk_create_returning_pks(OrderItem, added)
+        Order.items.through.objects.bulk_create(
+            [Order.items.through(order=order, orderitem=i) for i in added]
+        )
+    if order.completed_date:
+        date = timezone.localdate(order.completed_date)
+        DailySales.record([order], date, 1)
+        if order.organization_id is not None:
+            # Still one order, only its total moved.
+            DailyRevenue.add(
+                order.organization_id, date, 0, order.total - previous_total
+            )
+    return kept + changed + added
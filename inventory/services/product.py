@@ -0,0 +1,196 @@
+import itertools
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Prefetch, Subquery
+from rest_framework import serializers
+
+from inventory.cache import bump_catalog_version_on_commit
+from inventory.models import StockMovement, Variant, VariantFieldName, VarientField
+from inventory.services.search import index_variants
+from inventory.services.sku import assign_skus, sku_taken
+from inventory.services.stock import record_movements
+from inventory.utils import bulk_create_returning_pks
+
+MAX_BATCH_SIZE = 1000
+MAX_MATRIX_SIZE = 5000
+
+
+def with_default_variant(queryset, lookups=None):
+    """Attach the default variant's price and image to every product.
+
+    Two correlated subqueries replace iterating ``variant_set`` per product
+    in Product.default_price/default_image. ``lookups`` leaves out those a
+    sparse response doesn't render, see merak.sparse.
+    """
+    default_variant = Variant.objects.filter(
+        product=OuterRef("pk"), is_default=True
+    ).order_by("pk")
+    annotations = {
+        "default_variant_{}".format(field): Subquery(
+            default_variant.values(field)[:1]
+        )
+        for field in ("price", "image")
+    }
+    return queryset.annotate(
+        **{
+            name: annotation
+            for name, annotation in annotations.items()
+            if lookups is None or name in lookups
+        }
+    )
+
+
+def with_variant_fields(queryset, lookups=None):
+    """Load the fields VairantOutSerializer renders in two more queries."""
+    if lookups is not None and "field" not in lookups:
+        return queryset
+    return queryset.prefetch_related(
+        Prefetch("field", queryset=VarientField.objects.select_related("name"))
+    )
+
+
+def create_variants(product, rows, user):
+    """Create the variants of ``product`` described by ``rows`` in bulk.
+
+    Every row is ``{"field": [<VarientField id>], "price", "quantity", ...}``
+    with optional ``sku``, ``is_default``, ``is_active`` and ``taxable``.
+    Fields are resolved with one ``in_bulk``, skus are assigned in one pass
+    and the variants and their field rows are bulk inserted, so the query
+    count doesn't grow with the number of variants.
+    """
+    organization = user.organization
+    field_ids = {field_id for row in rows for field_id in row["field"]}
+    fields = VarientField.objects.filter(organization=organization).in_bulk(field_ids)
+    missing = field_ids - set(fields)
+    if missing:
+        raise serializers.ValidationError(
+            "Variant field {} does not exist".format(min(missing))
+        )
+
+    skus = [row["sku"] for row in rows if row.get("sku")]
+    taken = set(Variant.objects.filter(sku__in=skus).values_list("sku", flat=True))
+    duplicated = {sku for sku, count in Counter(skus).items() if count > 1}
+    if taken | duplicated:
+        raise serializers.ValidationError(
+            "Sku {} is already taken".format(sorted(taken | duplicated)[0])
+        )
+
+    variants = [
+        Variant(
+            product=product,
+            price=row["price"],
+            quantity=row["quantity"],
+            sku=row.get("sku", ""),
+            is_default=row.get("is_default", False),
+            is_active=row.get("is_active", False),
+            taxable=row.get("taxable", True),
+            organization=organization,
+        )
+        for row in rows
+    ]
+    variant_fields = [[fields[field_id] for field_id in row["field"]] for row in rows]
+    generated = [i for i, variant in enumerate(variants) if not variant.sku]
+    assign_skus(
+        [variants[i] for i in generated], [variant_fields[i] for i in generated]
+    )
+
+    try:
+        with transaction.atomic():
+            created = bulk_create_returning_pks(Variant, variants)
+            Variant.field.through.objects.bulk_create(
+                [
+                    Variant.field.through(
+                        variant_id=variant.id, varientfield_id=field.id
+                    )
+                    for variant, row_fields in zip(created, variant_fields)
+                    for field in dict.fromkeys(row_fields)
+                ]
+            )
+            # bulk_create skips the signals that index variants and drop the
+            # cached catalog lists.
+            index_variants([variant.id for variant in created])
+            record_movements(
+                {variant.id: variant.quantity for variant in created},
+                StockMovement.Reason.ADJUST,
+                user=user,
+            )
+            bump_catalog_version_on_commit(organization.id)
+    except IntegrityError as error:
+        # Another request saved one of the skus since they were checked.
+        sku = (
+            Variant.objects.filter(sku__in=[variant.sku for variant in variants])
+            .values_list("sku", flat=True)
+            .first()
+        )
+        raise sku_taken(error, sku or variants[0].sku)
+    return created
+
+
+def get_or_create_fields(values, organization):
+    """``{(name, value): VarientField}`` for ``values``, creating the missing ones.
+
+    Field names and fields are each looked up with one query and the
+    missing ones inserted with one more.
+    """
+    names = {name for name, _ in values}
+    # Names aren't unique, the oldest one wins.
+    name_ids = dict(
+        VariantFieldName.objects.filter(name__in=names)
+        .order_by("-id")
+        .values_list("name", "id")
+    )
+    created = bulk_create_returning_pks(
+        VariantFieldName,
+        [VariantFieldName(name=name) for name in names if name not in name_ids],
+    )
+    name_ids.update((name.name, name.id) for name in created)
+
+    fields = {
+        (field.name_id, field.value): field
+        for field in VarientField.objects.filter(
+            organization=organization,
+            name_id__in=name_ids.values(),
+            value__in={value for _, value in values},
+        ).order_by("-id")
+    }
+    missing = [
+        VarientField(name_id=name_ids[name], value=value, organization=organization)
+        for name, value in dict.fromkeys(values)
+        if (name_ids[name], value) not in fields
+    ]
+    for field in bulk_create_returning_pks(VarientField, missing):
+        fields[(field.name_id, field.value)] = field
+    return {(name, value): fields[(name_ids[name], value)] for name, value in values}
+
+
+def generate_variant_matrix(product, axes, price, quantity, user):
+    """Create a variant of ``product`` for every combination of ``axes``.
+
+    ``axes`` is ``{field name: [value]}``, e.g. sizes by colors by fits; every
+    variant gets the same price and opening quantity. Combinations the
+    product already has are skipped, so adding a value to an axis and
+    generating again only creates the new variants. Everything happens in
+    one transaction with a fixed number of queries, see create_variants.
+    """
+    values = [(name, value) for name, axis in axes.items() for value in axis]
+    with transaction.atomic():
+        fields = get_or_create_fields(values, user.organization)
+        existing = {}
+        for variant_id, field_id in Variant.field.through.objects.filter(
+            variant__product=product
+        ).values_list("variant_id", "varientfield_id"):
+            existing.setdefault(variant_id, set()).add(field_id)
+        existing = {frozenset(field_ids) for field_ids in existing.values()}
+
+        rows = []
+        for combination in itertools.product(
+            *[[fields[(name, value)].id for value in axis] for name, axis in axes.items()]
+        ):
+            if frozenset(combination) not in existing:
+                rows.append(
+                    {"field": list(combination), "price": price, "quantity": quantity}
+                )
+        if not rows:
+            return []
+        return create_variants(product, rows, user)
@@ -0,0 +1,110 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from inventory.cache import bump_catalog_version_on_commit
+from inventory.models import Variant
+
+# Largest first, each rendition is scaled down from the one before it.
+RENDITIONS = {"medium": (800, 800), "thumb": (200, 200)}
+JPEG_QUALITY = 85
+
+
+def rendition_name(name, rendition):
+    """``variant_images/a.png`` -> ``variant_images/a.thumb.jpg``."""
+    return "{}.{}.jpg".format(os.path.splitext(name)[0], rendition)
+
+
+def rendition_names(name):
+    return [rendition_name(name, rendition) for rendition in RENDITIONS]
+
+
+def _to_rgb(image):
+    if image.mode in ("RGB", "L"):
+        return image
+    image = image.convert("RGBA")
+    # JPEG has no alpha, transparent pixels become white rather than black.
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def create_renditions(field_file):
+    """Write every rendition of an image file next to it.
+
+    Returns ``{"source": name, <rendition>: name}``. The original is decoded
+    once; JPEGs are decoded straight at a reduced scale when they are much
+    larger than the biggest rendition.
+    """
+    storage = field_file.storage
+    renditions = {"source": field_file.name}
+    names = {
+        rendition: rendition_name(field_file.name, rendition)
+        for rendition in RENDITIONS
+    }
+    # Content addressed renditions may be shared with other rows, so they are
+    # reused (and touched, see merak.files.sweep_files) rather than replaced.
+    shared = getattr(storage, "content_addressed", False)
+    if shared and all(storage.touch(name) for name in names.values()):
+        return {**renditions, **names}
+
+    with field_file.open("rb") as stream, Image.open(stream) as image:
+        image.draft("RGB", max(RENDITIONS.values()))
+        image = _to_rgb(ImageOps.exif_transpose(image))
+        for rendition, size in RENDITIONS.items():
+            image.thumbnail(size)
+            buffer = BytesIO()
+            image.save(
+                buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True
+            )
+            name = names[rendition]
+            if not shared and storage.exists(name):
+                storage.delete(name)
+            renditions[rendition] = storage.save(name, ContentFile(buffer.getvalue()))
+    return renditions
+
+
+def refresh_renditions(model, pk, field="image"):
+    """Bring ``image_renditions`` of one row in line with its image.
+
+    Returns whether renditions were written or removed. A row whose image
+    changed while its renditions were rendered is left for the task the
+    newer upload queued.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return False
+    image = getattr(instance, field)
+    previous = instance.image_renditions
+    if previous.get("source") == (image.name or None):
+        return False
+
+    renditions = create_renditions(image) if image else {}
+    changes = {"image_renditions": renditions}
+    if any(f.name == "updated_at" for f in model._meta.fields):
+        # So ETags and exports see the new URLs.
+        changes["updated_at"] = timezone.now()
+    updated = model.objects.filter(pk=pk, **{field: image.name}).update(**changes)
+    if not updated:
+        # Renditions of an image the row no longer uses are swept with it,
+        # see merak.files.
+        return False
+    if model is Variant:
+        bump_catalog_version_on_commit(instance.organization_id)
+    return True
+
+
+def rendition_urls(field_file, renditions):
+    """``{rendition: url}``, the original stands in until renditions exist."""
+    if not field_file:
+        return None
+    if renditions.get("source") != field_file.name:
+        renditions = {}
+    storage = field_file.storage
+    return {
+        rendition: storage.url(renditions.get(rendition, field_file.name))
+        for rendition in RENDITIONS
+    }
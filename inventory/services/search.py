@@ -0,0 +1,97 @@
+import re
+
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from inventory.models import Variant, VariantSearchTerm
+
+MAX_TERM_LENGTH = VariantSearchTerm._meta.get_field("term").max_length
+MAX_QUERY_WORDS = 10
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def get_search_terms(variant):
+    """``{term: is_word}`` for every prefix of every word describing ``variant``."""
+    words = tokenize(variant.sku)
+    if variant.product:
+        words += tokenize(variant.product.name)
+    for field in variant.field.all():
+        words += tokenize(field.value)
+
+    terms = {}
+    for word in words:
+        word = word[:MAX_TERM_LENGTH]
+        for length in range(1, len(word)):
+            terms.setdefault(word[:length], False)
+        terms[word] = True
+    return terms
+
+
+def build_search_terms(variants):
+    return [
+        VariantSearchTerm(
+            variant=variant,
+            term=term,
+            is_word=is_word,
+            organization_id=variant.organization_id,
+        )
+        for variant in variants
+        for term, is_word in get_search_terms(variant).items()
+    ]
+
+
+def index_variants(variant_ids):
+    """Rebuild the search terms of ``variant_ids`` with one delete and one insert."""
+    variants = (
+        Variant.objects.filter(id__in=variant_ids)
+        .select_related("product")
+        .prefetch_related("field")
+    )
+    VariantSearchTerm.objects.filter(variant_id__in=variant_ids).delete()
+    VariantSearchTerm.objects.bulk_create(build_search_terms(variants), batch_size=1000)
+
+
+def search_variants(queryset, query):
+    """Variants that have a word starting with each word of ``query``.
+
+    Every word is a lookup on the (term, variant) index, so the cost follows
+    the number of matches rather than the size of the catalog. Variants where
+    more query words match a whole word rank first.
+    """
+    words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_WORDS]
+    if not words:
+        return queryset
+
+    # Drive the query from the rarest word and only check the others against
+    # the variants it found. Counting postings only touches the index.
+    words = [word[:MAX_TERM_LENGTH] for word in words]
+    frequency = dict(
+        VariantSearchTerm.objects.filter(term__in=words)
+        .values("term")
+        .annotate(count=Count("id"))
+        .values_list("term", "count")
+    )
+    words.sort(key=lambda word: frequency.get(word, 0))
+
+    queryset = queryset.filter(
+        id__in=VariantSearchTerm.objects.filter(term=words[0]).values("variant_id")
+    )
+    for word in words[1:]:
+        queryset = queryset.filter(
+            Exists(VariantSearchTerm.objects.filter(variant=OuterRef("pk"), term=word))
+        )
+
+    # Ranking only lives in ORDER BY so that pagination counts skip it.
+    whole_words = (
+        VariantSearchTerm.objects.filter(
+            variant=OuterRef("pk"), term__in=words, is_word=True
+        )
+        .values("variant")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    rank = Coalesce(Subquery(whole_words, output_field=IntegerField()), Value(0))
+    return queryset.order_by(rank.desc(), "sku")
@@ -0,0 +1,61 @@
+import uuid
+
+from rest_framework import serializers
+
+from inventory.models import Variant
+
+SKU_MAX_LENGTH = Variant._meta.get_field("sku").max_length
+SKU_SUFFIX_LENGTH = 5
+
+
+def get_base_sku(variant, fields):
+    sku = (variant.product.name if variant.product else "") + "-"
+    sku += "-".join(str(field.value) for field in fields)
+    return sku[: SKU_MAX_LENGTH - SKU_SUFFIX_LENGTH]
+
+
+def assign_skus(variants, fields):
+    """Give every variant a unique sku before it is saved.
+
+    ``fields`` holds the VarientFields of each variant, in the same order.
+    Clashes with the table and within the batch are found with one query and
+    resolved with a random suffix; suffixed skus are checked again, which
+    almost never takes more than one extra query. The unique constraint on
+    sku catches anything inserted concurrently.
+    """
+    bases = [get_base_sku(variant, f) for variant, f in zip(variants, fields)]
+    skus = list(bases)
+    pending = list(range(len(variants)))
+    accepted = set()
+
+    while pending:
+        taken = set(
+            Variant.objects.filter(sku__in=[skus[i] for i in pending])
+            .exclude(pk__in=[variants[i].pk for i in pending if variants[i].pk])
+            .values_list("sku", flat=True)
+        )
+        clashes = []
+        for i in pending:
+            if skus[i] in taken or skus[i] in accepted:
+                skus[i] = bases[i] + uuid.uuid4().hex[:SKU_SUFFIX_LENGTH]
+                clashes.append(i)
+            else:
+                accepted.add(skus[i])
+        pending = clashes
+
+    for variant, sku in zip(variants, skus):
+        variant.sku = sku
+    return variants
+
+
+def sku_taken(error, sku):
+    """A 400 for ``error`` when the unique_variant_sku constraint raised it.
+
+    assign_skus checks the table first, so this only happens when another
+    request saved the same sku in between.
+    """
+    if "sku" not in str(error):
+        raise error
+    return serializers.ValidationError(
+        {"sku": ["Variant with sku {} already exists".format(sku)]}
+    )
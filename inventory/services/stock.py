@@ -0,0 +1,229 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from inventory.cache import bump_catalog_version_on_commit
+from inventory.models import StockMovement, StockSnapshot, Variant
+
+# Movements are folded into snapshots once they are this old.
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+
+class OutOfStock(serializers.ValidationError):
+    default_detail = "Not enough quantity for product."
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(id=variant_id, then=Value(n)) for variant_id, n in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def count_quantities(lines):
+    """Sum ``(variant_id, quantity)`` pairs so each variant appears once."""
+    quantities = Counter()
+    for variant_id, quantity in lines:
+        quantities[variant_id] += quantity
+    return {variant_id: n for variant_id, n in quantities.items() if n}
+
+
+def _organization_id(order, user):
+    if order is not None:
+        return order.organization_id
+    if user is not None:
+        return user.organization_id
+    return None
+
+
+def record_movements(changes, reason, order=None, user=None, organization_id=None):
+    """Journal ``{variant_id: signed quantity}`` with a single insert."""
+    if organization_id is None:
+        organization_id = _organization_id(order, user)
+    now = timezone.now()
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                variant_id=variant_id,
+                quantity=quantity,
+                reason=reason,
+                order=order,
+                created_by=user,
+                organization_id=organization_id,
+                created_at=now,
+            )
+            for variant_id, quantity in changes.items()
+            if quantity
+        ]
+    )
+
+
+def move_stock(changes, reason, order=None, user=None):
+    """Apply ``{variant_id: signed quantity}`` to stock, all of it or none of it.
+
+    This is a single ``UPDATE ... SET quantity = quantity + n`` which, for the
+    variants losing stock, also requires ``quantity >= -n``. Concurrent orders
+    for the same variant can never oversell: the database re-checks the
+    condition against the latest row when two updates collide. The movements
+    are journaled in the same transaction.
+    """
+    changes = {variant_id: n for variant_id, n in changes.items() if n}
+    if not changes:
+        return
+    taken = {variant_id: -n for variant_id, n in changes.items() if n < 0}
+    fits = Q(id__in=[variant_id for variant_id, n in changes.items() if n > 0])
+    if taken:
+        fits |= Q(id__in=taken.keys(), quantity__gte=_quantity_case(taken))
+    try:
+        with transaction.atomic():
+            updated = Variant.objects.filter(fits).update(
+                quantity=F("quantity") + _quantity_case(changes),
+                updated_at=timezone.now(),
+            )
+            if updated != len(changes):
+                # Roll back the rows that did fit before reporting.
+                raise OutOfStock()
+            record_movements(changes, reason, order=order, user=user)
+            # The UPDATE skips post_save, so the cached lists are dropped here.
+            bump_catalog_version_on_commit(_organization_id(order, user))
+    except OutOfStock:
+        short = (
+            Variant.objects.filter(id__in=taken.keys(), quantity__lt=_quantity_case(taken))
+            .select_related("product")
+            .first()
+        )
+        name = short.product.name if short and short.product else short
+        raise OutOfStock("Not enough quantity for product {}".format(name))
+
+
+def reserve_stock(quantities, order=None, user=None):
+    """Take ``{variant_id: quantity}`` out of stock for an order."""
+    move_stock(
+        {variant_id: -n for variant_id, n in quantities.items()},
+        StockMovement.Reason.RESERVE,
+        order=order,
+        user=user,
+    )
+
+
+def release_stock(quantities, order=None, user=None):
+    """Put ``{variant_id: quantity}`` of an order back into stock."""
+    move_stock(quantities, StockMovement.Reason.RELEASE, order=order, user=user)
+
+
+def set_stock(variant, quantity, user=None):
+    """Set a variant's stock by hand, journaled as the difference."""
+    with transaction.atomic():
+        current = (
+            Variant.objects.select_for_update()
+            .values_list("quantity", flat=True)
+            .get(id=variant.id)
+        )
+        move_stock(
+            {variant.id: quantity - current}, StockMovement.Reason.ADJUST, user=user
+        )
+    variant.quantity = quantity
+
+
+def stock_at(variant_id, moment):
+    """A variant's stock at ``moment``, from its snapshots and movements."""
+    snapshot = (
+        StockSnapshot.objects.filter(variant_id=variant_id, taken_at__lte=moment)
+        .order_by("-movement")
+        .first()
+    )
+    movements = StockMovement.objects.filter(
+        variant_id=variant_id, created_at__lte=moment
+    )
+    if snapshot is not None:
+        movements = movements.filter(id__gt=snapshot.movement_id)
+    moved = movements.aggregate(total=Coalesce(Sum("quantity"), 0))["total"]
+    return (snapshot.quantity if snapshot else 0) + moved
+
+
+def _latest_snapshot(field):
+    return Subquery(
+        StockSnapshot.objects.filter(variant=OuterRef("variant"))
+        .order_by("-movement")
+        .values(field)[:1]
+    )
+
+
+def take_snapshots(lag=SNAPSHOT_LAG, batch_size=1000):
+    """Fold the movements since each variant's last snapshot into a new one.
+
+    Movements younger than ``lag`` are left for the next run so that a
+    transaction still writing older movement ids isn't skipped. Returns the
+    number of snapshots taken.
+    """
+    pending = (
+        StockMovement.objects.filter(created_at__lte=timezone.now() - lag)
+        .annotate(snapshot_movement=Coalesce(_latest_snapshot("movement"), 0))
+        .filter(id__gt=F("snapshot_movement"))
+        .values("variant")
+        .annotate(
+            moved=Sum("quantity"),
+            movement=Max("id"),
+            taken_at=Max("created_at"),
+        )
+        .annotate(base=Coalesce(_latest_snapshot("quantity"), 0))
+        .order_by()
+    )
+    taken = 0
+    snapshots = []
+    for row in pending.iterator(chunk_size=batch_size):
+        snapshots.append(
+            StockSnapshot(
+                variant_id=row["variant"],
+                quantity=row["base"] + row["moved"],
+                movement_id=row["movement"],
+                taken_at=row["taken_at"],
+            )
+        )
+        if len(snapshots) == batch_size:
+            StockSnapshot.objects.bulk_create(snapshots)
+            taken += len(snapshots)
+            snapshots = []
+    StockSnapshot.objects.bulk_create(snapshots)
+    return taken + len(snapshots)
+
+
+def find_drift():
+    """Variants whose quantity disagrees with their last snapshot plus the
+    movements since. Returns ``[(variant_id, quantity, journaled)]``."""
+    snapshot = StockSnapshot.objects.filter(variant=OuterRef("pk")).order_by(
+        "-movement"
+    )
+    moved = (
+        StockMovement.objects.filter(
+            variant=OuterRef("pk"), id__gt=OuterRef("snapshot_movement")
+        )
+        .values("variant")
+        .annotate(total=Sum("quantity"))
+        .values("total")
+    )
+    return list(
+        Variant.objects.annotate(
+            snapshot_movement=Coalesce(Subquery(snapshot.values("movement")[:1]), 0),
+            journaled=Coalesce(Subquery(snapshot.values("quantity")[:1]), 0)
+            + Coalesce(Subquery(moved, output_field=IntegerField()), 0),
+        )
+        .exclude(quantity=F("journaled"))
+        .values_list("id", "quantity", "journaled")
+    )
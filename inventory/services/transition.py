@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from inventory.models import DailyRevenue, DailySales, Order, Status
+
+ACTIONS = ("accept", "reject", "reject_accepted", "process", "complete")
+MAX_BATCH_SIZE = 500
+
+
+def assignable_to(user):
+    """Orders nobody has taken yet or that were assigned to ``user``."""
+    return Q(assigned_to__isnull=True) | Q(assigned_to=user)
+
+
+def visible_to(user):
+    """Orders owned by ``user`` or by the admin ``user`` works for."""
+    return Q(owned_by__in=[owner for owner in (user.admin, user) if owner])
+
+
+def get_transition(action, user):
+    """The condition an order has to meet for ``action`` and what it sets."""
+    now = timezone.now()
+    if action == "accept":
+        condition = Q(status=Status.PENDING) & assignable_to(user)
+        changes = {"status": Status.ACCEPTED, "assigned_to": user}
+    elif action == "reject":
+        condition = Q(status=Status.PENDING) & assignable_to(user)
+        changes = {"assigned_to": None}
+    elif action == "reject_accepted":
+        condition = Q(status=Status.ACCEPTED, assigned_to=user)
+        changes = {"status": Status.PENDING, "assigned_to": None}
+    elif action == "process":
+        condition = Q(status=Status.ACCEPTED, assigned_to=user)
+        changes = {"status": Status.PROCESSING}
+    elif action == "complete":
+        condition = Q(
+            status__in=[Status.ACCEPTED, Status.PROCESSING],
+            assigned_to=user,
+            completed_date__isnull=True,
+        )
+        changes = {"status": Status.COMPLETED, "completed_date": now}
+    else:
+        raise ValueError("Unknown order action {}".format(action))
+    return condition & visible_to(user), {**changes, "updated_at": now}
+
+
+def _record_completed(orders, date):
+    # UPDATEs skip Order.save, so completions reach the rollup from here.
+    per_organization = (
+        orders.exclude(organization__isnull=True)
+        .values("organization_id")
+        .annotate(orders=Count("id"), revenue=Sum("total"))
+        .order_by()
+    )
+    for row in per_organization:
+        DailyRevenue.add(row["organization_id"], date, row["orders"], row["revenue"])
+    DailySales.record(orders, date, 1)
+
+
+def transition_order(user, uuid, action):
+    """Apply ``action`` to one order with a single conditional UPDATE.
+
+    Returns whether this call moved the order. When two users race for the
+    same order the database re-checks the condition on the latest row, so
+    only one of them wins.
+    """
+    condition, changes = get_transition(action, user)
+    if action != "complete":
+        return bool(Order.objects.filter(condition, uuid=uuid).update(**changes))
+
+    with transaction.atomic():
+        won = bool(Order.objects.filter(condition, uuid=uuid).update(**changes))
+        if won:
+            _record_completed(
+                Order.objects.filter(uuid=uuid),
+                timezone.localdate(changes["completed_date"]),
+            )
+    return won
+
+
+def transition_orders(user, uuids, action):
+    """Apply ``action`` to many orders at once, returns the uuids it moved.
+
+    The orders that meet the condition are locked and then moved with one
+    UPDATE, so the winners are known without reading every order back.
+    """
+    condition, changes = get_transition(action, user)
+    with transaction.atomic():
+        won = list(
+            Order.objects.select_for_update()
+            .filter(condition, uuid__in=uuids)
+            .values_list("id", "uuid")
+        )
+        orders = Order.objects.filter(id__in=[id for id, _ in won])
+        orders.update(**changes)
+        if won and action == "complete":
+            _record_completed(orders, timezone.localdate(changes["completed_date"]))
+    return [uuid for _, uuid in won]
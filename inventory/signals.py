@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from inventory.cache import bump_catalog_version_on_commit
+from inventory.models import CatalogImport, Order, Product, Variant, VarientField
+from inventory.services.rendition import rendition_names
+from inventory.services.search import index_variants
+from inventory.tasks import queue_renditions
+from merak.files import register_file_field
+from user.models import Customer
+
+register_file_field(Variant, "image", derived=rendition_names)
+# Queued imports read their file later, finished ones keep it for reference.
+register_file_field(CatalogImport, "file")
+
+
+@receiver(post_save, sender=Variant)
+def index_saved_variant(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_variants([instance.id])
+
+
+@receiver(post_save, sender=Variant)
+def render_variant_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        queue_renditions(instance)
+
+
+@receiver(m2m_changed, sender=Variant.field.through)
+def index_variant_fields(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            index_variants([instance.id])
+        return
+
+    # A field was attached to or detached from variants.
+    if action == "pre_clear":
+        instance._cleared_variant_ids = list(
+            instance.variant_set.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        index_variants(instance.__dict__.pop("_cleared_variant_ids", []))
+    elif action in ("post_add", "post_remove"):
+        index_variants(pk_set)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=VarientField)
+def index_related_variants(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        index_variants(list(instance.variant_set.values_list("id", flat=True)))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Variant)
+@receiver(post_save, sender=VarientField)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Variant)
+@receiver(post_delete, sender=VarientField)
+def invalidate_catalog_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_catalog_version_on_commit(instance.organization_id)
+
+
+@receiver(m2m_changed, sender=Variant.field.through)
+def invalidate_catalog_cache_on_fields(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_catalog_version_on_commit(instance.organization_id)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=get_user_model())
+def touch_orders(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Orders nest their customer and staff member, their ETags follow the
+    # order's own updated_at, see OrderView.
+    if raw or update_fields == {"last_login"}:
+        return
+    field = "ordered_by" if sender is Customer else "assigned_to"
+    Order.objects.filter(**{field: instance}).update(updated_at=timezone.now())
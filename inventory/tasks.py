@@ -0,0 +1,55 @@
+import logging
+
+from celery import shared_task
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import CatalogImport
+from inventory.services.catalog import import_catalog
+from inventory.services.rendition import refresh_renditions
+from inventory.services.stock import take_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def import_catalog_task(import_id):
+    catalog_import = CatalogImport.objects.select_related("created_by").get(id=import_id)
+    catalog_import.status = CatalogImport.ImportStatus.RUNNING
+    catalog_import.save(update_fields=["status"])
+
+    def progress(stats):
+        CatalogImport.objects.filter(id=import_id).update(stats=stats)
+
+    try:
+        with catalog_import.file.open("rb") as stream:
+            catalog_import.stats = import_catalog(
+                stream, catalog_import.format, catalog_import.created_by, progress=progress
+            )
+        catalog_import.status = CatalogImport.ImportStatus.COMPLETED
+    except Exception:
+        logger.exception("Catalog import %s failed", import_id)
+        catalog_import.refresh_from_db(fields=["stats"])
+        catalog_import.status = CatalogImport.ImportStatus.FAILED
+    catalog_import.finished_at = timezone.now()
+    catalog_import.save(update_fields=["stats", "status", "finished_at"])
+
+
+@shared_task
+def snapshot_stock_task():
+    """Run periodically, e.g. from celery beat, to keep stock_at() cheap."""
+    logger.info("Took %s stock snapshots", take_snapshots())
+
+
+@shared_task
+def generate_renditions_task(model_label, pk):
+    refresh_renditions(apps.get_model(model_label), pk)
+
+
+def queue_renditions(instance, field="image"):
+    """Render ``instance``'s image in the background once it is committed."""
+    image = getattr(instance, field)
+    if instance.image_renditions.get("source") != (image.name or None):
+        label, pk = instance._meta.label, instance.pk
+        transaction.on_commit(lambda: generate_renditions_task.delay(label, pk))
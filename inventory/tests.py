@@ -1,13 +1,40 @@
 from asyncio.log import logger
 from email import header
 from django.urls import reverse
+from datetime import timedelta
+from decimal import Decimal
+import io
+import json
+import os
+from unittest import mock
 import pytest
 from rest_framework.test import force_authenticate
 from rest_framework.test import APIRequestFactory
-from inventory.models import Order
+from django.db import OperationalError, connection, transaction
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from inventory.models import CatalogImport, DailyRevenue, DailySales, Order, OrderItem, Product, Status, StockMovement, StockSnapshot, Variant, VariantFieldName, VarientField
+from inventory.management.commands.explain_queries import audit_queries, explain, find_full_scans
+from inventory.management.commands.stock_contention import run_contention
+from inventory.services.catalog import import_catalog
+from inventory.services.order import create_order, update_order_items
+from inventory.services.search import search_variants
+from inventory.services.sku import assign_skus
+from inventory.services.stock import OutOfStock, find_drift, record_movements, release_stock, reserve_stock, stock_at, take_snapshots
+from inventory.services.transition import transition_order, transition_orders
+from inventory.management.commands.generate_renditions import pending_jobs
+from django.core.management import call_command
+from inventory.services.rendition import refresh_renditions, rendition_name
+from inventory.tasks import generate_renditions_task, import_catalog_task
 from inventory.views import AcceptOrderView
 from rest_framework.test import APIClient
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 from django.test.client import Client
+from django.utils import timezone
+from merak.files import sweep_files
+from merak.pagination import KeysetPagination
+from django.core.files.storage import default_storage
 
 from user.models import Customer, Organization, User
 
@@ -30,6 +57,11 @@ def user_two(db):
 def staff(db, admin):
     return User.objects.create_user(email="staff@test.com", password="test", status = "Active", admin = admin)
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Ids repeat between tests, so cached catalog lists must not outlive one.
+    cache.clear()
+
 @pytest.fixture
 def orderer(db, organization):
     return Customer.objects.create(name="orderer",organization=organization)
@@ -46,6 +78,20 @@ def order_model_with_no_owner(db,orderer, user_two):
 def order_model_which_is_assigned_to_another_user(db,orderer, user_two):
     return Order.objects.create(ordered_by=orderer, owned_by=user_two, assigned_to = user_two)
 
+@pytest.fixture
+def organization_admin(admin, organization):
+    admin.organization = organization
+    admin.save()
+    return admin
+
+@pytest.fixture
+def variants(db, organization_admin, organization):
+    product = Product.objects.create(name="shirt", organization=organization, owned_by=organization_admin)
+    return [
+        Variant.objects.create(product=product, price=100, quantity=50, sku=f"shirt-{i}", organization=organization)
+        for i in range(20)
+    ]
+
 @pytest.fixture
 def admin_token(admin):
     response = client.post(
@@ -125,4 +171,1110 @@ def test_accept_pending_order_with_invalid_assigner(order_model_which_is_assigne
     response = regular_client.get(reverse("accept_pending_order", args =(order_model_which_is_assigned_to_another_user.uuid,)))
     
     assert response.status_code == 404
-    assert response.data.get("detail") == "Order doesn't exists."
\ No newline at end of file
+    assert response.data.get("detail") == "Order doesn't exists."
+@pytest.mark.django_db
+def test_create_order_with_many_items(regular_client, variants, orderer):
+    response = regular_client.post(
+        "/inventory/order/",
+        {
+            "ordered_by": orderer.id,
+            "items": [{"product": variant.sku, "quantity": 2} for variant in variants],
+        },
+    )
+
+    assert response.status_code == 201
+    assert len(response.data.get("items")) == len(variants)
+    assert set(Variant.objects.values_list("quantity", flat=True)) == {48}
+
+@pytest.mark.django_db
+def test_create_order_query_count_does_not_depend_on_lines(organization_admin, variants, orderer):
+    def count_queries(lines):
+        with CaptureQueriesContext(connection) as context:
+            create_order(
+                organization_admin,
+                [{"product": variant.sku, "quantity": 1} for variant in lines],
+                orderer.id,
+            )
+        return len(context.captured_queries)
+
+    assert count_queries(variants[:2]) == count_queries(variants)
+
+@pytest.mark.django_db
+def test_create_order_with_unknown_sku_is_rolled_back(regular_client, variants, orderer):
+    response = regular_client.post(
+        "/inventory/order/",
+        {
+            "ordered_by": orderer.id,
+            "items": [{"product": variants[0].sku, "quantity": 1}, {"product": "missing", "quantity": 1}],
+        },
+    )
+
+    assert response.status_code == 400
+    assert Variant.objects.get(id=variants[0].id).quantity == 50
+    assert not OrderItem.objects.exists()
+
+@pytest.mark.django_db
+def test_batch_create_orders(regular_client, variants, orderer):
+    response = regular_client.post(
+        "/inventory/order/batch/",
+        [
+            {"ordered_by": orderer.id, "items": [{"product": variant.sku, "quantity": 5}]}
+            for variant in variants[:3]
+        ],
+    )
+
+    assert response.status_code == 201
+    assert len(response.data) == 3
+    assert Order.objects.count() == 3
+    assert Variant.objects.get(id=variants[0].id).quantity == 45
+
+@pytest.mark.django_db
+def test_reserve_stock_is_all_or_nothing(variants):
+    variants[1].quantity = 1
+    variants[1].save()
+
+    with pytest.raises(OutOfStock):
+        reserve_stock({variants[0].id: 10, variants[1].id: 2})
+
+    assert Variant.objects.get(id=variants[0].id).quantity == 50
+    assert Variant.objects.get(id=variants[1].id).quantity == 1
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_orders_on_one_sku_never_oversell():
+    variant = Variant.objects.create(price=1, quantity=25, sku="hot")
+
+    sold, rejected, _ = run_contention(variant.id, threads=4, orders_per_thread=10)
+
+    assert sold == 25
+    assert rejected == 15
+    assert Variant.objects.get(id=variant.id).quantity == 0
+
+def test_contention_gives_up_on_a_persistent_database_error():
+    error = OperationalError("no such table: inventory_variant")
+    with mock.patch("inventory.management.commands.stock_contention.reserve_stock", side_effect=error) as reserve, \
+            mock.patch("inventory.management.commands.stock_contention.MAX_ATTEMPTS", 3):
+        with pytest.raises(OperationalError):
+            run_contention(1, threads=2, orders_per_thread=5)
+    # Each thread gives up on its first order.
+    assert reserve.call_count == 6
+
+@pytest.fixture
+def orders(organization_admin, variants, orderer):
+    return [
+        create_order(
+            organization_admin,
+            [{"product": variant.sku, "quantity": 1} for variant in variants[i : i + 5]],
+            orderer.id,
+            assigned_to=organization_admin.id,
+        )
+        for i in range(10)
+    ]
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url, queries",
+    [
+        ("/inventory/order/", 7),
+        ("/inventory/get_order/pending", 4),
+        ("/inventory/order/get_user_pending_order/", 4),
+    ],
+)
+def test_order_list_query_count_is_fixed(regular_client, orders, url, queries, django_assert_num_queries):
+    # user, [organization, version, count,] orders, items with variants, variant fields
+    with django_assert_num_queries(queries):
+        response = regular_client.get(url)
+
+    assert response.status_code == 200
+
+@pytest.mark.django_db
+def test_order_totals_are_stored_on_create(organization_admin, variants, orderer):
+    variants[1].taxable = False
+    variants[1].save()
+
+    order = create_order(
+        organization_admin,
+        [{"product": variants[0].sku, "quantity": 2}, {"product": variants[1].sku, "quantity": 1}],
+        orderer.id,
+    )
+    order.refresh_from_db()
+
+    assert order.sub_total == Decimal("300.00")
+    assert order.tax == Decimal("26.00")
+    assert order.total == Decimal("326.00")
+
+@pytest.mark.django_db
+def test_filter_and_order_by_total(regular_client, organization_admin, variants, orderer):
+    # The newest order isn't the largest, so -ordered_date would give 300, 500.
+    for quantity in (1, 5, 3):
+        create_order(organization_admin, [{"product": variants[0].sku, "quantity": quantity}], orderer.id)
+
+    response = regular_client.get("/inventory/order/", {"min_total": 300, "ordering": "-total"})
+    assert [order["sub_total"] for order in response.data["results"]] == [500, 300]
+
+    response = regular_client.get("/inventory/order/", {"min_total": 300, "ordering": "total"})
+    assert [order["sub_total"] for order in response.data["results"]] == [300, 500]
+
+@pytest.mark.django_db
+def test_completing_and_cancelling_orders_maintains_daily_revenue(organization_admin, variants, orderer):
+    first, second = [
+        create_order(organization_admin, [{"product": variants[0].sku, "quantity": 1}], orderer.id)
+        for _ in range(2)
+    ]
+    for order in (first, second):
+        order.status = Status.COMPLETED
+        order.save()
+    first.delete()
+
+    rollup = DailyRevenue.objects.get()
+    assert rollup.orders == 1
+    assert rollup.revenue == second.total
+
+@pytest.mark.django_db
+def test_editing_then_cancelling_a_completed_order_keeps_the_rollups(organization_admin, variants, orderer):
+    order = create_order(organization_admin, [{"product": variants[0].sku, "quantity": 1}], orderer.id)
+    order.status = Status.COMPLETED
+    order.save()
+
+    with transaction.atomic():
+        update_order_items(order, [{"product": variants[0].sku, "quantity": 3}, {"product": variants[1].sku, "quantity": 1}])
+        order.save()
+    rollup = DailyRevenue.objects.get()
+    assert (rollup.orders, rollup.revenue) == (1, order.total)
+    assert sum(DailySales.objects.values_list("revenue", flat=True)) == order.sub_total
+
+    order.delete()
+    rollup.refresh_from_db()
+    assert (rollup.orders, rollup.revenue) == (0, 0)
+    assert set(DailySales.objects.values_list("quantity", "revenue")) == {(0, 0)}
+
+@pytest.mark.django_db
+def test_line_totals_keep_the_price_the_order_was_placed_at(regular_client, organization_admin, variants, orderer):
+    order = create_order(organization_admin, [{"product": variants[0].sku, "quantity": 2}], orderer.id)
+    Variant.objects.filter(pk=variants[0].pk).update(price=150)
+
+    response = regular_client.get(f"/inventory/order/{order.uuid}/")
+    assert response.data["sub_total"] == 200
+    assert response.data["items"][0]["line_total"] == 200
+
+@pytest.mark.django_db
+def test_earning_summary(regular_client, organization_admin, variants, orderer):
+    orders = [
+        create_order(organization_admin, [{"product": variants[0].sku, "quantity": 1}], orderer.id, assigned_to=organization_admin.id)
+        for _ in range(3)
+    ]
+    orders[0].status = Status.COMPLETED
+    orders[0].save()
+
+    response = regular_client.get(reverse("earning"), {"period": "month"})
+
+    assert response.status_code == 200
+    assert response.data["pending"] == {"orders": 2, "total": Decimal("226.00")}
+    assert response.data["completed"] == {"orders": 1, "total": Decimal("113.00")}
+    assert [row["total"] for row in response.data["by_period"]] == [Decimal("113.00")]
+    assert response.data["by_staff"][0]["assigned_to"] == organization_admin.id
+
+@pytest.mark.django_db
+def test_search_variants_matches_word_prefixes_and_ranks_whole_words_first(organization):
+    product = Product.objects.create(name="Polo Shirt", organization=organization)
+    long = Variant.objects.create(product=product, price=1, sku="polo-red-xlong", organization=organization)
+    xl = Variant.objects.create(product=product, price=1, sku="polo-red-xl", organization=organization)
+    Variant.objects.create(product=product, price=1, sku="polo-blue-xl", organization=organization)
+
+    results = list(search_variants(Variant.objects.all(), "RE xl shirt"))
+
+    assert results == [xl, long]
+
+@pytest.mark.django_db
+def test_search_index_follows_field_changes(organization):
+    product = Product.objects.create(name="cap", organization=organization)
+    variant = Variant.objects.create(product=product, price=1, sku="cap-1", organization=organization)
+    color = VarientField.objects.create(name=VariantFieldName.objects.create(name="color"), value="olive")
+
+    variant.field.add(color)
+    assert list(search_variants(Variant.objects.all(), "oli")) == [variant]
+
+    color.value = "navy"
+    color.save()
+    assert list(search_variants(Variant.objects.all(), "oli")) == []
+    assert list(search_variants(Variant.objects.all(), "navy")) == [variant]
+
+@pytest.mark.django_db
+def test_assign_skus_resolves_clashes_in_one_query(organization, django_assert_num_queries):
+    product = Product.objects.create(name="cap", organization=organization)
+    red = VarientField(value="red")
+    Variant.objects.create(product=product, price=1, sku="cap-red", organization=organization)
+    variants = [Variant(product=product, price=1) for _ in range(3)]
+
+    with django_assert_num_queries(2):
+        assign_skus(variants, [[red], [red], [VarientField(value="blue")]])
+
+    skus = [variant.sku for variant in variants]
+    assert skus[2] == "cap-blue"
+    assert len(set(skus + ["cap-red"])) == 4
+    assert all(sku.startswith("cap-red") for sku in skus[:2])
+
+@pytest.mark.django_db
+def test_create_variant_assigns_sku_before_insert(regular_client, organization_admin, organization):
+    product = Product.objects.create(name="cap", organization=organization)
+    color = VarientField.objects.create(name=VariantFieldName.objects.create(name="color"), value="red")
+
+    response = regular_client.post(
+        "/inventory/variant/", {"product": product.id, "price": 10, "field": [color.id]}
+    )
+
+    assert response.status_code == 200
+    assert response.data["sku"] == "cap-red"
+
+    response = regular_client.post(
+        "/inventory/variant/", {"product": product.id, "price": 10, "field": ["red"]}
+    )
+    assert response.status_code == 400
+    assert "field" in response.data
+
+    # Another request saved cap-red after assign_skus looked.
+    with mock.patch("inventory.serializers.product.assign_skus", side_effect=lambda variants, fields: setattr(variants[0], "sku", "cap-red")):
+        response = regular_client.post(
+            "/inventory/variant/", {"product": product.id, "price": 10, "field": [color.id]}
+        )
+    assert response.status_code == 400
+    assert response.data == {"sku": ["Variant with sku cap-red already exists"]}
+
+@pytest.mark.django_db
+def test_product_list_query_count_is_fixed(regular_client, organization_admin, organization, django_assert_num_queries):
+    for i in range(5):
+        product = Product.objects.create(name=f"product-{i}", organization=organization)
+        Variant.objects.create(product=product, price=i, sku=f"product-{i}-a", organization=organization)
+        Variant.objects.create(product=product, price=i + 1, sku=f"product-{i}-b", is_default=True, organization=organization)
+
+    # user, owners, organization, version, count, products
+    with django_assert_num_queries(6):
+        response = regular_client.get("/inventory/product/")
+
+    assert [product["default_price"] for product in response.data["results"]] == [1, 2, 3, 4, 5]
+    assert response.data["results"][0]["default_image"] is None
+
+@pytest.mark.django_db
+def test_order_cursor_pagination_walks_every_order_once(regular_client, orders, organization_admin, variants, orderer):
+    response = regular_client.get("/inventory/order/", {"pagination": "cursor", "page_size": 4})
+    seen = [order["invoice"] for order in response.data["results"]]
+    assert len(seen) == 4
+    assert response.data["previous"] is None
+
+    # Orders placed while walking the list don't shift the pages still ahead.
+    create_order(organization_admin, [{"product": variants[0].sku, "quantity": 1}], orderer.id)
+    while response.data["next"]:
+        response = regular_client.get(response.data["next"])
+        seen += [order["invoice"] for order in response.data["results"]]
+
+    assert seen == [str(order.uuid) for order in reversed(orders)]
+
+@pytest.mark.django_db
+def test_cursor_page_size_is_capped(regular_client, variants):
+    response = regular_client.get("/inventory/variant/", {"pagination": "cursor", "page_size": 5})
+    assert len(response.data["results"]) == 5
+    assert "count" not in response.data
+
+    with mock.patch.object(KeysetPagination, "max_page_size", 15):
+        response = regular_client.get("/inventory/variant/", {"pagination": "cursor", "page_size": 1000})
+    assert len(response.data["results"]) == 15
+
+CATALOG_CSV = b"""product,description,price,quantity,sku,color,size
+tee,cotton tee,10,5,,red,m
+tee,,10,5,,red,l
+tee,,12,0,tee-blue-xl,blue,xl
+cap,,abc,1,,red,
+cap,,7,3,,red,
+"""
+
+@pytest.mark.django_db
+def test_import_catalog_from_csv(organization_admin, organization):
+    stats = import_catalog(io.BytesIO(CATALOG_CSV), "csv", organization_admin, batch_size=2)
+
+    assert stats["rows"] == 5
+    assert stats["products"] == 2
+    assert stats["variants"] == 4
+    assert stats["errors"] == [{"line": 5, "error": "price and quantity must be numbers"}]
+    assert Product.objects.filter(organization=organization).count() == 2
+    assert VarientField.objects.filter(organization=organization, value="red").count() == 1
+    assert sorted(Variant.objects.values_list("sku", flat=True)) == ["cap-red", "tee-blue-xl", "tee-red-l", "tee-red-m"]
+    assert [v.sku for v in search_variants(Variant.objects.all(), "tee blue")] == ["tee-blue-xl"]
+
+    # Rows with an sku that already exists are skipped, the others come in again.
+    stats = import_catalog(io.BytesIO(CATALOG_CSV), "csv", organization_admin)
+    assert stats["skipped"] == 1
+    assert Product.objects.filter(organization=organization).count() == 2
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", [30, 300])
+def test_import_catalog_query_count_does_not_depend_on_rows(organization_admin, size):
+    rows = b"\n".join(
+        json.dumps({"product": f"p{i % 3}", "price": i, "sku": f"p-{i}", "fields": {"size": "m", "color": f"c{i}"}}).encode()
+        for i in range(size)
+    )
+    import_catalog(io.BytesIO(b'{"product": "warmup", "price": 1, "size": "m"}'), "jsonl", organization_admin)
+
+    with CaptureQueriesContext(connection) as context:
+        stats = import_catalog(io.BytesIO(rows), "jsonl", organization_admin, batch_size=size)
+
+    assert stats["variants"] == size
+    # SQLite splits big inserts into several statements, everything else is fixed.
+    queries = [q["sql"] for q in context.captured_queries if not q["sql"].startswith("INSERT")]
+    assert len(queries) == 14
+    # Every row brings a new color, inserted in bulk with the others.
+    inserts = [q["sql"] for q in context.captured_queries if q["sql"].startswith('INSERT INTO "inventory_varientfield"')]
+    assert len(inserts) <= 2
+
+@pytest.mark.django_db(transaction=True)
+def test_catalog_import_api_runs_the_import_in_the_background(regular_client, organization_admin, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    upload = SimpleUploadedFile("catalog.csv", CATALOG_CSV, content_type="text/csv")
+
+    with mock.patch("inventory.apis.catalog.import_catalog_task.delay", side_effect=import_catalog_task) as delay:
+        response = regular_client.post("/inventory/catalog_import/", {"file": upload}, format="multipart")
+
+    assert response.status_code == 201
+    assert response.data["format"] == "csv"
+    delay.assert_called_once_with(response.data["id"])
+    response = regular_client.get(f"/inventory/catalog_import/{response.data['id']}/")
+    assert response.data["status"] == "COMPLETED"
+    assert response.data["stats"]["variants"] == 4
+
+    # The upload is stored by content like any other, the sweep keeps it.
+    name = CatalogImport.objects.get().file.name
+    assert name.startswith("content/")
+    assert sweep_files(default_storage, 0) == []
+    assert (tmp_path / name).exists()
+
+@pytest.mark.django_db
+def test_export_variants_as_ndjson_and_csv(regular_client, variants):
+    response = regular_client.get("/inventory/variant/export/")
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [row["sku"] for row in rows] == [f"shirt-{i}" for i in range(20)]
+    assert rows[0]["product__name"] == "shirt"
+
+    response = regular_client.get("/inventory/variant/export/", {"output": "csv"})
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0].startswith("id,sku,product_id,product__name,price")
+    assert len(lines) == 21
+
+@pytest.mark.django_db
+def test_export_since_only_returns_changed_rows(regular_client, orders, variants):
+    since = timezone.now()
+    reserve_stock({variants[3].id: 1})
+    order = orders[0]
+    order.status = Status.COMPLETED
+    order.save()
+
+    response = regular_client.get("/inventory/variant/export/", {"since": since.isoformat()})
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [(row["sku"], row["quantity"]) for row in rows] == [("shirt-3", 45)]
+
+    response = regular_client.get("/inventory/order/export/", {"since": since.isoformat(), "output": "csv"})
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 2
+    assert str(order.uuid) in lines[1]
+
+@pytest.mark.django_db
+def test_only_one_user_wins_an_order(admin, staff, order_model, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert transition_order(staff, order_model.uuid, "accept")
+    assert not transition_order(admin, order_model.uuid, "accept")
+
+    order_model.refresh_from_db()
+    assert order_model.status == Status.ACCEPTED
+    assert order_model.assigned_to == staff
+
+@pytest.mark.django_db
+def test_order_by_action_view_moves_the_order(regular_client, admin, order_model):
+    response = regular_client.get(reverse("order_by_action", args=(order_model.uuid, "accept")))
+    assert response.status_code == 200
+    assert response.data["status"] == "ACCEPTED"
+
+    response = regular_client.get(reverse("order_by_action", args=(order_model.uuid, "reject_accepted")))
+    assert response.status_code == 200
+    assert response.data["status"] == "PENDING"
+    assert response.data["assigned_to"] is None
+
+    response = regular_client.get(reverse("order_by_action", args=(order_model.uuid, "fly")))
+    assert response.status_code == 400
+
+@pytest.mark.django_db
+def test_batch_transition_reports_failures_and_keeps_the_rollup(regular_client, orders, organization):
+    uuids = [str(order.uuid) for order in orders]
+    transition_order(orders[0].owned_by, uuids[0], "accept")
+    transition_order(orders[0].owned_by, uuids[0], "complete")
+
+    response = regular_client.post(reverse("order_batch_action"), {"action": "accept", "orders": uuids[:5]})
+    assert response.data == {"moved": uuids[1:5], "failed": uuids[:1]}
+
+    response = regular_client.post(reverse("order_batch_action"), {"action": "complete", "orders": uuids[:5] + ["unknown"]})
+    assert response.data == {"moved": uuids[1:5], "failed": uuids[:1] + ["unknown"]}
+
+    rollup = DailyRevenue.objects.get(organization=organization)
+    completed = Order.objects.filter(status=Status.COMPLETED)
+    assert rollup.orders == completed.count() == 5
+    assert rollup.revenue == sum(order.total for order in completed)
+
+@pytest.mark.django_db
+def test_dispatch_assigns_pending_orders_and_reports_conflicts(regular_client, orders, organization, organization_admin, staff, django_assert_max_num_queries):
+    staff.organization = organization
+    staff.save()
+    uuids = [str(order.uuid) for order in orders]
+    transition_order(organization_admin, uuids[0], "accept")
+    assignments = {
+        staff.id: uuids[:4] + ["unknown"],
+        organization_admin.id: uuids[3:6],
+    }
+
+    # user, org owners, organization, staff, savepoint, lock, 2 updates,
+    # release, conflict statuses
+    with django_assert_max_num_queries(10):
+        response = regular_client.post("/inventory/order/dispatch/", {"assignments": assignments})
+
+    assert response.status_code == 200
+    assert response.data["assigned"] == {staff.id: uuids[1:3], organization_admin.id: uuids[4:6]}
+    assert response.data["conflicts"] == [
+        {"order": uuids[3], "detail": "Order is listed for more than one staff member"},
+        {"order": uuids[0], "detail": "Order is accepted"},
+        {"order": "unknown", "detail": "Order doesn't exists."},
+    ]
+    assert Order.objects.filter(assigned_to=staff).count() == 2
+
+@pytest.mark.django_db
+def test_dispatch_rejects_staff_of_other_organizations(regular_client, orders, user_two):
+    response = regular_client.post(
+        "/inventory/order/dispatch/", {"assignments": {user_two.id: [str(orders[0].uuid)]}}
+    )
+    assert response.status_code == 400
+    assert not Order.objects.filter(assigned_to=user_two).exists()
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes():
+    assert [(name, scans) for name, _, scans in audit_queries() if scans] == []
+    assert find_full_scans(explain(Variant.objects.filter(price=1))) == ["inventory_variant"]
+
+@pytest.fixture
+def journaled_variants(variants):
+    record_movements({variant.id: variant.quantity for variant in variants}, StockMovement.Reason.ADJUST)
+    return variants
+
+@pytest.mark.django_db
+def test_stock_journal_explains_every_change(regular_client, journaled_variants, orderer):
+    variants = journaled_variants
+    response = regular_client.post(
+        "/inventory/order/",
+        {"ordered_by": orderer.id, "items": [{"product": variants[0].sku, "quantity": 3}]},
+    )
+    order = Order.objects.get(uuid=response.data["invoice"])
+    regular_client.put(
+        f"/inventory/order/{order.uuid}/",
+        {"ordered_by": orderer.id, "items": [{"product": variants[0].sku, "quantity": 1}]},
+    )
+    response = regular_client.post(f"/inventory/variant/{variants[0].sku}/adjust/", {"quantity": -10})
+    assert response.data["quantity"] == 39
+
+    response = regular_client.post(f"/inventory/variant/{variants[0].sku}/adjust/", {"quantity": -40})
+    assert response.status_code == 400
+
+    response = regular_client.get(f"/inventory/variant/{variants[0].sku}/movements/")
+    assert [(m["reason"], m["quantity"]) for m in response.data["results"]] == [
+        ("ADJUST", -10),
+        ("RELEASE", 2),
+        ("RESERVE", -3),
+        ("ADJUST", 50),
+    ]
+    assert response.data["results"][1]["order"] == str(order.uuid)
+    assert find_drift() == []
+
+@pytest.mark.django_db
+def test_snapshots_fold_movements_and_answer_stock_at(journaled_variants):
+    variant = journaled_variants[0]
+    opened = timezone.now()
+    assert take_snapshots(lag=timedelta(0)) == 20
+
+    reserve_stock({variant.id: 5})
+    after_order = timezone.now()
+    release_stock({variant.id: 2})
+
+    assert take_snapshots(lag=timedelta(0)) == 1
+    assert StockSnapshot.objects.filter(variant=variant).latest("movement").quantity == 47
+    assert stock_at(variant.id, opened) == 50
+    assert stock_at(variant.id, after_order) == 45
+    assert stock_at(variant.id, timezone.now()) == 47
+    assert find_drift() == []
+
+    Variant.objects.filter(id=variant.id).update(quantity=1)
+    assert find_drift() == [(variant.id, 1, 47)]
+
+@pytest.mark.django_db
+def test_snapshotted_variant_can_be_deleted(regular_client, journaled_variants, django_capture_on_commit_callbacks):
+    variant = journaled_variants[0]
+    take_snapshots(lag=timedelta(0))
+    with django_capture_on_commit_callbacks(execute=True):
+        response = regular_client.delete(f"/inventory/variant/{variant.sku}/")
+    assert response.status_code == 204
+    assert not StockSnapshot.objects.filter(variant_id=variant.id).exists()
+    assert StockSnapshot.objects.count() == 19
+
+
+def _edit_one_line(organization_admin, orderer, variants, lines):
+    order = create_order(
+        organization_admin,
+        [{"product": variant.sku, "quantity": 1} for variant in variants[:lines]],
+        orderer.id,
+    )
+    items = [{"product": variant.sku, "quantity": 1} for variant in variants[:lines]]
+    items[0]["quantity"] = 3
+    with CaptureQueriesContext(connection) as context:
+        with transaction.atomic():
+            update_order_items(order, items, user=organization_admin)
+    return order, len(context.captured_queries)
+
+@pytest.mark.django_db
+def test_order_item_edit_query_count_is_fixed(organization_admin, orderer, variants):
+    _, small = _edit_one_line(organization_admin, orderer, variants[:2], 2)
+    _, large = _edit_one_line(organization_admin, orderer, variants[2:], 18)
+    assert small == large
+
+@pytest.mark.django_db
+def test_order_item_edit_only_touches_changed_lines(regular_client, orderer, variants):
+    response = regular_client.post(
+        "/inventory/order/",
+        {
+            "ordered_by": orderer.id,
+            "items": [
+                {"product": variants[0].sku, "quantity": 2},
+                {"product": variants[1].sku, "quantity": 4},
+                {"product": variants[2].sku, "quantity": 1},
+            ],
+        },
+    )
+    order = Order.objects.get(uuid=response.data["invoice"])
+    before = {item.product_id: item.id for item in order.items.all()}
+
+    response = regular_client.put(
+        f"/inventory/order/{order.uuid}/",
+        {
+            "ordered_by": orderer.id,
+            "items": [
+                {"product": variants[1].sku, "quantity": 1},
+                {"product": variants[0].sku, "quantity": 2},
+                {"product": variants[3].sku, "quantity": 5},
+            ],
+        },
+    )
+    assert response.status_code == 201
+
+    after = {item.product_id: item for item in order.items.all()}
+    assert set(after) == {variants[0].id, variants[1].id, variants[3].id}
+    assert after[variants[0].id].id == before[variants[0].id]
+    assert after[variants[1].id].id == before[variants[1].id]
+    assert after[variants[1].id].quantity == 1
+    assert after[variants[3].id].organization_id == order.organization_id
+    assert not OrderItem.objects.filter(id=before[variants[2].id]).exists()
+
+    stock = dict(Variant.objects.filter(id__in=after.keys() | before.keys()).values_list("id", "quantity"))
+    assert stock == {variants[0].id: 48, variants[1].id: 49, variants[2].id: 50, variants[3].id: 45}
+    order.refresh_from_db()
+    assert order.sub_total == 800
+
+@pytest.mark.django_db
+def test_order_update_changes_customer_and_staff(regular_client, organization, organization_admin, orderer, variants):
+    customer = Customer.objects.create(name="Second", organization=organization)
+    response = regular_client.post(
+        "/inventory/order/",
+        {"ordered_by": orderer.id, "items": [{"product": variants[0].sku, "quantity": 1}]},
+    )
+    response = regular_client.put(
+        f"/inventory/order/{response.data['invoice']}/",
+        {
+            "ordered_by": customer.id,
+            "assigned_to": organization_admin.id,
+            "items": [{"product": variants[0].sku, "quantity": 1}],
+        },
+    )
+    assert response.status_code == 201
+    order = Order.objects.get(uuid=response.data["invoice"])
+    assert order.ordered_by == customer
+    assert order.assigned_to == organization_admin
+    assert order.items.count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/inventory/order/{order}/", "/inventory/variant/{sku}/", "/inventory/product/{product}/"])
+def test_detail_not_modified_skips_serializers(regular_client, orders, variants, url):
+    url = url.format(order=orders[0].uuid, sku=variants[0].sku, product=variants[0].product.uuid)
+    response = regular_client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert etag.startswith('W/"')
+
+    with CaptureQueriesContext(connection) as context:
+        response = regular_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    # Authentication and permissions aside, only the version lookup runs.
+    assert not any("inventory_variantfieldname" in query["sql"] for query in context.captured_queries)
+
+@pytest.mark.django_db
+def test_etag_changes_with_nested_rows(regular_client, orders, orderer, organization_admin, django_capture_on_commit_callbacks):
+    url = f"/inventory/order/{orders[0].uuid}/"
+    etag = regular_client.get(url)["ETag"]
+    # The lines' variants are versioned apart from the order's timestamp.
+    assert "Last-Modified" not in regular_client.get(url)
+
+    orderer.name = "Renamed"
+    orderer.save()
+    response = regular_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["ordered_by"]["name"] == "Renamed"
+
+    etag = response["ETag"]
+    with django_capture_on_commit_callbacks(execute=True):
+        reserve_stock({orders[0].items.first().product_id: 1}, user=organization_admin)
+    assert regular_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+@pytest.mark.django_db
+def test_order_etag_follows_staff_and_variant_fields(regular_client, orders, organization_admin, organization, django_capture_on_commit_callbacks):
+    url = f"/inventory/order/{orders[0].uuid}/"
+    etag = regular_client.get(url)["ETag"]
+
+    organization_admin.phone = "555-0100"
+    organization_admin.save()
+    response = regular_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["assigned_to"]["phone"] == "555-0100"
+
+    etag = response["ETag"]
+    variant = orders[0].items.first().product
+    with django_capture_on_commit_callbacks(execute=True):
+        field = VarientField.objects.create(name=VariantFieldName.objects.create(name="color"), value="red", organization=organization)
+        variant.field.add(field)
+    etag = regular_client.get(url, HTTP_IF_NONE_MATCH=etag)["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        field.value = "blue"
+        field.save()
+    response = regular_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    fields = [item["product"]["field"] for item in response.data["items"] if item["product"]["id"] == variant.id]
+    assert fields[0][0]["value"] == "blue"
+
+@pytest.mark.django_db
+def test_order_list_etag_reads_only_the_orders(regular_client, orders, orderer):
+    response = regular_client.get("/inventory/order/")
+    etag = response["ETag"]
+    with CaptureQueriesContext(connection) as context:
+        assert regular_client.get("/inventory/order/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert not any("inventory_orderitem" in query["sql"] for query in context.captured_queries)
+
+    orderer.name = "Renamed"
+    orderer.save()
+    assert regular_client.get("/inventory/order/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+@pytest.mark.django_db
+def test_list_etag_follows_rows_and_query(regular_client, variants, django_capture_on_commit_callbacks):
+    response = regular_client.get("/inventory/variant/?limit=5")
+    etag = response["ETag"]
+    assert "Last-Modified" not in response
+    assert regular_client.get("/inventory/variant/?limit=5", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert regular_client.get("/inventory/variant/?limit=6", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        variants[-1].delete()
+    assert regular_client.get("/inventory/variant/?limit=5", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/inventory/product/", "/inventory/variant/?limit=5"])
+def test_catalog_lists_are_cached_until_a_write(regular_client, variants, url, django_capture_on_commit_callbacks):
+    response = regular_client.get(url)
+    assert response.status_code == 200
+
+    with CaptureQueriesContext(connection) as context:
+        cached = regular_client.get(url)
+    assert cached.data == response.data
+    assert not any("inventory_" in query["sql"] for query in context.captured_queries)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        VarientField.objects.create(name=VariantFieldName.objects.create(name="color"), value="red", organization=variants[0].organization)
+    with CaptureQueriesContext(connection) as context:
+        regular_client.get(url)
+    assert any("inventory_" in query["sql"] for query in context.captured_queries)
+
+@pytest.mark.django_db
+def test_stock_updates_invalidate_cached_variants(regular_client, organization_admin, variants, django_capture_on_commit_callbacks):
+    url = "/inventory/variant/?limit=100"
+
+    def quantity():
+        results = regular_client.get(url).data["results"]
+        return next(v["quantity"] for v in results if v["id"] == variants[0].id)
+
+    assert quantity() == 50
+    with django_capture_on_commit_callbacks(execute=True):
+        reserve_stock({variants[0].id: 5}, user=organization_admin)
+    assert quantity() == 45
+
+    etag = regular_client.get(url)["ETag"]
+    assert regular_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def _post_variant_batch(client, product, fields, count):
+    return client.post(
+        "/inventory/variant/batch/",
+        {
+            "product": product.id,
+            "variants": [
+                {"field": [field.id for field in fields], "price": "9.50", "quantity": i}
+                for i in range(count)
+            ],
+        },
+        format="json",
+    )
+
+@pytest.mark.django_db
+def test_variant_batch_creates_variants_in_fixed_queries(regular_client, organization_admin, organization):
+    product = Product.objects.create(name="tee", organization=organization)
+    color = VariantFieldName.objects.create(name="color")
+    fields = [
+        VarientField.objects.create(name=color, value="red", organization=organization),
+        VarientField.objects.create(name=VariantFieldName.objects.create(name="size"), value="xl", organization=organization),
+    ]
+
+    counts = []
+    for count in (2, 20):
+        with CaptureQueriesContext(connection) as context:
+            response = _post_variant_batch(regular_client, product, fields, count)
+        assert response.status_code == 201, response.data
+        counts.append(len([q for q in context.captured_queries if not q["sql"].startswith("INSERT")]))
+    assert counts[0] == counts[1]
+
+    variants = Variant.objects.filter(product=product)
+    assert variants.count() == 22
+    assert len({variant.sku for variant in variants}) == 22
+    assert all(variant.sku.startswith("tee-red-xl") for variant in variants)
+    assert response.data[3]["quantity"] == 3
+    assert [field["name"] for field in response.data[0]["field"]] == ["color", "size"]
+    # Zero opening quantities need no movement.
+    assert StockMovement.objects.filter(variant__product=product).count() == 20
+    assert len(search_variants(Variant.objects.all(), "tee red")) == 22
+    assert find_drift() == []
+
+    # Another request saved one of the skus after they were checked.
+    taken = variants.first().sku
+    with mock.patch("inventory.services.product.assign_skus", side_effect=lambda variants, fields: setattr(variants[0], "sku", taken)):
+        response = _post_variant_batch(regular_client, product, fields, 2)
+    assert response.status_code == 400
+    assert response.data == {"sku": [f"Variant with sku {taken} already exists"]}
+    assert variants.count() == 22
+
+@pytest.mark.django_db
+def test_variant_batch_rejects_foreign_products_and_fields(regular_client, organization_admin, organization, user_two):
+    other = Organization.objects.create(name="other", owner=user_two)
+    product = Product.objects.create(name="tee", organization=organization)
+    foreign_field = VarientField.objects.create(name=VariantFieldName.objects.create(name="color"), value="red", organization=other)
+
+    response = _post_variant_batch(regular_client, product, [foreign_field], 1)
+    assert response.status_code == 400
+    response = _post_variant_batch(regular_client, Product.objects.create(name="cap", organization=other), [], 1)
+    assert response.status_code == 400
+    assert not Variant.objects.exists()
+
+@pytest.mark.django_db
+def test_variant_matrix_creates_every_missing_combination(regular_client, organization_admin, organization):
+    product = Product.objects.create(name="tee", uuid="tee", organization=organization)
+    red = VarientField.objects.create(name=VariantFieldName.objects.create(name="color"), value="red", organization=organization)
+    url = f"/inventory/product/{product.uuid}/matrix/"
+
+    response = regular_client.post(
+        url, {"axes": {"size": ["s", "m", "l"], "color": ["red", "blue"]}, "price": "12.00", "quantity": 4}, format="json"
+    )
+    assert response.status_code == 201
+    assert len(response.data) == 6
+    assert {variant["sku"] for variant in response.data} == {f"tee-{size}-{color}" for size in "sml" for color in ("red", "blue")}
+    assert Variant.objects.filter(product=product, field=red).count() == 3
+    assert VarientField.objects.filter(organization=organization).count() == 5
+    assert VariantFieldName.objects.count() == 2
+
+    response = regular_client.post(
+        url, {"axes": {"size": ["s", "m", "l", "xl"], "color": ["red", "blue"]}, "price": "12.00"}, format="json"
+    )
+    assert sorted(variant["sku"] for variant in response.data) == ["tee-xl-blue", "tee-xl-red"]
+    assert Variant.objects.filter(product=product).count() == 8
+    assert find_drift() == []
+
+@pytest.mark.django_db
+def test_variant_matrix_size_is_limited(regular_client, organization_admin, organization):
+    product = Product.objects.create(name="tee", uuid="tee", organization=organization)
+    axes = {"a": [str(i) for i in range(100)], "b": [str(i) for i in range(100)]}
+    response = regular_client.post(f"/inventory/product/{product.uuid}/matrix/", {"axes": axes, "price": 1}, format="json")
+    assert response.status_code == 400
+    assert not Variant.objects.exists()
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (255, 0, 0, 128)).save(buffer, "PNG")
+    return SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+
+@pytest.mark.django_db
+def test_image_upload_queues_renditions(regular_client, variants, settings, tmp_path, django_capture_on_commit_callbacks):
+    settings.MEDIA_ROOT = tmp_path
+    variant = variants[0]
+    with mock.patch("inventory.tasks.generate_renditions_task.delay", side_effect=generate_renditions_task) as delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            variant.image = _png(1600, 900)
+            variant.save()
+    delay.assert_called_once_with("inventory.Variant", variant.id)
+
+    variant.refresh_from_db()
+    renditions = variant.image_renditions
+    assert renditions["source"] == variant.image.name
+    with Image.open(tmp_path / renditions["thumb"]) as thumb:
+        assert thumb.size == (200, 113)
+        assert thumb.format == "JPEG"
+    with Image.open(tmp_path / renditions["medium"]) as medium:
+        assert medium.size == (800, 450)
+
+    response = regular_client.get(f"/inventory/variant/{variant.sku}/")
+    assert response.data["image_renditions"]["thumb"].endswith(renditions["thumb"])
+    assert not list(pending_jobs("inventory.Variant"))
+
+    # Nothing to do until the image changes, then the old renditions are
+    # swept with the old image.
+    assert refresh_renditions(Variant, variant.id) is False
+    with mock.patch("inventory.tasks.generate_renditions_task.delay"):
+        with django_capture_on_commit_callbacks(execute=True):
+            variant.image = _png(100, 100)
+            variant.save()
+    assert list(pending_jobs("inventory.Variant")) == [("inventory.Variant", variant.id)]
+    assert refresh_renditions(Variant, variant.id) is True
+    variant.refresh_from_db()
+    assert variant.image_renditions["source"] == variant.image.name
+
+    assert (tmp_path / renditions["thumb"]).exists()
+    assert set(sweep_files(default_storage, 0)) == {renditions["source"], renditions["thumb"], renditions["medium"]}
+    assert (tmp_path / variant.image_renditions["thumb"]).exists()
+
+@pytest.mark.django_db
+def test_renditions_fall_back_to_the_original(regular_client, variants, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    variant = variants[0]
+    assert regular_client.get(f"/inventory/variant/{variant.sku}/").data["image_renditions"] is None
+
+    variant.image = _png(300, 300)
+    variant.save()
+    urls = regular_client.get(f"/inventory/variant/{variant.sku}/").data["image_renditions"]
+    assert urls["thumb"] == urls["medium"]
+    assert urls["thumb"].endswith(variant.image.name)
+
+
+@pytest.mark.django_db
+def test_identical_uploads_share_one_file(variants, settings, tmp_path, django_capture_on_commit_callbacks):
+    settings.MEDIA_ROOT = tmp_path
+    first, second = variants[0], variants[1]
+    with mock.patch("inventory.tasks.generate_renditions_task.delay"):
+        with django_capture_on_commit_callbacks(execute=True):
+            first.image = _png(50, 50)
+            first.save()
+            second.image = _png(50, 50)
+            second.save()
+    assert first.image.name == second.image.name
+    assert first.image.name.startswith("content/")
+    stored = tmp_path / first.image.name
+    assert stored.exists()
+
+    # Deleting one variant leaves the file the other still uses.
+    first.delete()
+    assert sweep_files(default_storage, 0) == []
+    with mock.patch("inventory.tasks.generate_renditions_task.delay"):
+        second.image = None
+        second.save()
+    assert stored.exists()
+
+    # Storing the same bytes again renews the file, so a sweep doesn't take
+    # it from under the row about to use it.
+    os.utime(stored, (0, 0))
+    assert default_storage.save("photo.png", _png(50, 50)) == first.image.name
+    assert sweep_files(default_storage, 60) == []
+    assert stored.exists()
+
+    os.utime(stored, (0, 0))
+    call_command("sweep_media", "--grace", "60", stdout=io.StringIO())
+    assert not stored.exists()
+
+
+@pytest.mark.django_db
+def test_deduplicate_media_moves_legacy_uploads(variants, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / "variant_images").mkdir()
+    for name in ("a.png", "b.png"):
+        (tmp_path / "variant_images" / name).write_bytes(_png(30, 30).read())
+    (tmp_path / "variant_images" / "a.thumb.jpg").write_bytes(b"old thumb")
+    Variant.objects.filter(pk=variants[0].pk).update(image="variant_images/a.png", image_renditions={"source": "variant_images/a.png", "thumb": "variant_images/a.thumb.jpg"})
+    Variant.objects.filter(pk=variants[1].pk).update(image="variant_images/b.png")
+
+    out = io.StringIO()
+    call_command("deduplicate_media", "--dry-run", stdout=out)
+    assert "2 files (0.0 MiB) hold 1 distinct contents" in out.getvalue()
+    assert (tmp_path / "variant_images" / "a.png").exists()
+
+    call_command("deduplicate_media", stdout=io.StringIO())
+    names = set(Variant.objects.filter(pk__in=[variants[0].pk, variants[1].pk]).values_list("image", flat=True))
+    assert len(names) == 1
+    name = names.pop()
+    assert name.startswith("content/") and name.endswith(".png")
+    assert (tmp_path / name).exists()
+    assert not list((tmp_path / "variant_images").iterdir())
+    assert Variant.objects.get(pk=variants[0].pk).image_renditions == {}
+
+
+@pytest.mark.django_db
+def test_media_is_served_with_ranges_and_validators(variants, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    variant = variants[0]
+    with mock.patch("inventory.tasks.generate_renditions_task.delay"):
+        variant.image = _png(64, 64)
+        variant.save()
+    url = variant.image.url
+    body = (tmp_path / variant.image.name).read_bytes()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == body
+    assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response["Accept-Ranges"] == "bytes"
+    etag = response["ETag"]
+    assert etag.strip('"') in variant.image.name
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    response = client.get(url, HTTP_RANGE="bytes=10-19")
+    assert response.status_code == 206
+    assert response["Content-Range"] == f"bytes 10-19/{len(body)}"
+    assert b"".join(response.streaming_content) == body[10:20]
+    response = client.get(url, HTTP_RANGE="bytes=-5", HTTP_IF_RANGE=etag)
+    assert b"".join(response.streaming_content) == body[-5:]
+    # A stale If-Range gets the whole file.
+    assert client.get(url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"').status_code == 200
+    assert client.get(url, HTTP_RANGE=f"bytes={len(body)}-").status_code == 416
+
+    assert client.get("/media/../manage.py").status_code == 404
+    assert client.get("/media/content/missing.png").status_code == 404
+
+    # A rendition isn't named after its own bytes, so it's revalidated.
+    thumb = rendition_name(variant.image.name, "thumb")
+    (tmp_path / thumb).write_bytes(b"rendered")
+    response = client.get(settings.MEDIA_URL + thumb)
+    assert response["Cache-Control"] == "public, no-cache"
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_media_transfer_is_handed_to_the_front_server(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.MEDIA_SENDFILE_HEADER = "X-Accel-Redirect"
+    (tmp_path / "avatar_images").mkdir()
+    (tmp_path / "avatar_images" / "me.png").write_bytes(b"legacy")
+
+    response = client.get("/media/avatar_images/me.png", HTTP_RANGE="bytes=0-1")
+    assert response.status_code == 200
+    assert response["X-Accel-Redirect"] == "/protected-media/avatar_images/me.png"
+    assert response.content == b""
+    # Not content addressed, so it may change and is revalidated.
+    assert response["Cache-Control"] == "public, no-cache"
+    assert client.get("/media/avatar_images/me.png", HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+
+def _complete(orders, user):
+    uuids = [order.uuid for order in orders]
+    transition_orders(user, uuids, "accept")
+    transition_orders(user, uuids, "complete")
+
+
+def _sales():
+    return {
+        (row.variant_id, row.date): (row.quantity, row.revenue)
+        for row in DailySales.objects.all()
+    }
+
+
+@pytest.mark.django_db
+def test_sales_rollup_follows_completed_orders(orders, variants, organization_admin):
+    _complete(orders, organization_admin)
+    today = timezone.localdate()
+    assert DailySales.objects.get(variant=variants[4], date=today).quantity == 5
+    assert DailySales.objects.get(variant=variants[0], date=today).revenue == Decimal("100.00")
+
+    # A later price change doesn't change what the cancelled order takes back.
+    Variant.objects.filter(pk=variants[4].pk).update(price=999)
+    order = Order.objects.get(pk=orders[4].pk)
+    order.delete()
+    row = DailySales.objects.get(variant=variants[4], date=today)
+    assert (row.quantity, row.revenue) == (4, Decimal("400.00"))
+
+    incremental = _sales()
+    call_command("rebuild_sales", "--chunk-size", "3", stdout=io.StringIO())
+    assert _sales() == incremental
+
+
+@pytest.mark.django_db
+def test_sales_analytics_read_the_rollup(regular_client, orders, variants, organization_admin, django_assert_max_num_queries):
+    _complete(orders, organization_admin)
+
+    # The user and its organization, the rollup and the labels of the top rows.
+    with django_assert_max_num_queries(5):
+        response = regular_client.get(reverse("top_variants"), {"limit": 3})
+    assert response.status_code == 200
+    assert [(row["variant"], row["quantity"]) for row in response.data] == [
+        (variant.sku, 5) for variant in variants[4:7]
+    ]
+    assert response.data[0]["revenue"] == Decimal("500.00")
+
+    product = variants[0].product
+    response = regular_client.get(reverse("product_sales", args=(product.uuid,)))
+    assert response.data == [{"period": timezone.localdate(), "quantity": 50, "revenue": Decimal("5000.00")}]
+    assert regular_client.get(reverse("product_sales", args=("unknown",))).status_code == 404
+
+
+@pytest.mark.django_db
+def test_sparse_order_list_skips_unrequested_relations(regular_client, orders, django_assert_num_queries):
+    # user, organization, version, count, orders; no customers, items or variants
+    with django_assert_num_queries(5):
+        response = regular_client.get("/inventory/order/", {"fields": "invoice,status,total"})
+    assert response.status_code == 200
+    assert set(response.data["results"][0]) == {"invoice", "status", "total"}
+
+    response = regular_client.get(
+        "/inventory/order/",
+        {"fields": "invoice,ordered_by,items.quantity,items.product.sku", "expand": "items.product"},
+    )
+    order = response.data["results"][-1]
+    assert order["ordered_by"] == orders[0].ordered_by_id
+    assert order["items"][0] == {"product": {"sku": "shirt-0"}, "quantity": 1}
+
+
+@pytest.mark.django_db
+def test_expand_collapses_nested_serializers_to_keys(regular_client, orders):
+    order = orders[0]
+    response = regular_client.get(f"/inventory/order/{order.uuid}/", {"expand": ""})
+    assert response.data["ordered_by"] == order.ordered_by_id
+    assert response.data["assigned_to"] == order.assigned_to_id
+    assert sorted(response.data["items"]) == sorted(order.items.values_list("id", flat=True))
+    # Another representation of the same order, another ETag.
+    assert response["ETag"] != regular_client.get(f"/inventory/order/{order.uuid}/")["ETag"]
+
+    response = regular_client.get(f"/inventory/order/{order.uuid}/", {"fields": "invoice,colour"})
+    assert response.status_code == 400
+    assert response.data == {"fields": ["Unknown field colour"]}
+    response = regular_client.get(f"/inventory/order/{order.uuid}/", {"fields": "invoice.x,status"})
+    assert response.status_code == 400
+    assert response.data == {"fields": ["Unknown field invoice.x"]}
+    assert regular_client.get(f"/inventory/order/{order.uuid}/", {"expand": "status"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_sparse_product_list_drops_default_variant_subqueries(regular_client, variants):
+    with CaptureQueriesContext(connection) as queries:
+        response = regular_client.get("/inventory/product/", {"fields": "uuid,name"})
+    assert response.data["results"] == [{"uuid": str(variants[0].product.uuid), "name": "shirt"}]
+    assert not any("is_default" in query["sql"] for query in queries)
@@ -1,7 +1,13 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from inventory.apis.order import GetOrderByActionView, OrderByActionView
+from inventory.apis.catalog import CatalogImportView
+from inventory.apis.earning import EarningView, ProductSalesView, TopVariantsView
+from inventory.apis.order import (
+    GetOrderByActionView,
+    OrderBatchActionView,
+    OrderByActionView,
+)
 from inventory.views import (
     AcceptOrderView,
     DeclineAcceptedOrderView,
@@ -22,10 +28,15 @@ router.register("product", ProductView)
 router.register("variant", VariantView)
 router.register("order", OrderView)
 router.register("variant_field", VariantFieldView)
+router.register("catalog_import", CatalogImportView)
 
 order_api_patterns = [
+    path("order_action/batch/", OrderBatchActionView.as_view(), name="order_batch_action"),
     path("order_action/<uuid:uuid>/<str:action>", OrderByActionView.as_view(), name="order_by_action"),
     path("get_order/<str:action>", GetOrderByActionView.as_view(), name="get_order_by_action"),
+    path("earning/", EarningView.as_view(), name="earning"),
+    path("sales/top_variants/", TopVariantsView.as_view(), name="top_variants"),
+    path("sales/product/<str:uuid>/", ProductSalesView.as_view(), name="product_sales"),
 ]
 
 urlpatterns = [
@@ -0,0 +1,15 @@
+def bulk_create_returning_pks(model, objs, batch_size=None):
+    """bulk_create that always leaves the primary keys set on ``objs``.
+
+    Postgres returns the ids from the insert itself. SQLite on Django 3.2
+    doesn't, but it only allows one writer at a time, so inside the caller's
+    transaction the rows we just wrote are the newest ones in the table.
+    """
+    objs = model.objects.bulk_create(objs, batch_size=batch_size)
+    if objs and objs[0].pk is None:
+        pks = list(
+            model.objects.order_by("-pk").values_list("pk", flat=True)[: len(objs)]
+        )
+        for obj, pk in zip(objs, reversed(pks)):
+            obj.pk = pk
+    return objs
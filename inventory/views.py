@@ -7,7 +7,9 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.decorators import action
+from django.db import transaction
 from django.db.models import Q
+from inventory.cache import get_catalog_version
 from inventory.filters import OrderFilter, VariantFilter
 from inventory.models import (
     Order,
@@ -19,13 +21,26 @@ from inventory.models import (
 )
 
 from drf_yasg.utils import swagger_auto_schema
-from inventory.serializers.order import OrderInSerializer, OrderOutSerializer
+from inventory.serializers.export import ExportQuerySerializer
+from inventory.serializers.order import (
+    DispatchSerializer,
+    OrderInSerializer,
+    OrderOutSerializer,
+)
+from inventory.services.dispatch import dispatch_orders
+from inventory.services.export import ORDER_EXPORT_FIELDS, export_response
+from inventory.services.order import with_order_details
+from inventory.services.transition import transition_order
+from merak.conditional import ConditionalGetMixin
+from merak.pagination import LimitOffsetOrCursorPagination
+from merak.sparse import SparseFieldsMixin
 
 from user.models import Customer
+from user.permissions import UserIsEditor, UserIsOwner
 
 user_model = get_user_model()
 
-class OrderView(ModelViewSet):
+class OrderView(SparseFieldsMixin, ConditionalGetMixin, ModelViewSet):
     
     queryset = Order.objects.all()
     serializer_class = OrderOutSerializer
@@ -33,13 +48,24 @@ class OrderView(ModelViewSet):
     lookup_field = "uuid"
     permission_classes = (IsAuthenticated,)
     filterset_class = OrderFilter
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ("-ordered_date", "-id")
+
+    # Versioned by the order's own updated_at, so a list is one MAX and
+    # COUNT over order_org_updated_idx. Editing the customer or the staff
+    # member touches their orders (see inventory.signals); the variants and
+    # fields of the lines are covered by the catalog version instead, which
+    # every change to them bumps.
+    def get_version_tags(self):
+        return (get_catalog_version(self.request.user.organization_id),)
 
     def get_queryset(self):
-        return (
+        return with_order_details(
             super()
             .get_queryset()
             .filter(organization=self.request.user.organization)
-            .order_by("-ordered_date")
+            .order_by("-ordered_date"),
+            self.get_sparse_lookups(),
         )
 
     @swagger_auto_schema(
@@ -61,16 +87,60 @@ class OrderView(ModelViewSet):
     )
     def update(self, request, *args, **kwargs):
         serializer = self.perfomer_serializer_class(
-            self.get_object(), data=request.data
+            self.get_object(), data=request.data, context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
         return Response(self.serializer_class(order).data, status=201)
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.serializer_class(instance)
-        return Response(serializer.data)
+    @swagger_auto_schema(
+        request_body=perfomer_serializer_class(many=True),
+        responses={201: serializer_class(many=True)},
+    )
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Create many orders in one request, all of them or none."""
+        serializer = self.perfomer_serializer_class(
+            data=request.data, many=True, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            orders = serializer.save()
+        return Response(self.serializer_class(orders, many=True).data, status=201)
+
+    @swagger_auto_schema(request_body=DispatchSerializer)
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="dispatch",
+        permission_classes=[IsAuthenticated, UserIsOwner | UserIsEditor],
+    )
+    def dispatch_to_staff(self, request):
+        """Assign many pending orders to staff, ``{"assignments": {staff_id: [uuid]}}``."""
+        serializer = DispatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            dispatch_orders(
+                request.user.organization, serializer.validated_data["assignments"]
+            )
+        )
+
+    @swagger_auto_schema(query_serializer=ExportQuerySerializer)
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream every order of the organization as CSV or NDJSON."""
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(
+            Order.objects.filter(organization=request.user.organization)
+        )
+        return export_response(
+            queryset,
+            ORDER_EXPORT_FIELDS,
+            query.validated_data["output"],
+            query.validated_data.get("since"),
+            filename="orders",
+        )
 
 
 
@@ -79,27 +149,20 @@ class OrderView(ModelViewSet):
 
 
 
+def order_response(uuid):
+    order = with_order_details(Order.objects.filter(uuid=uuid)).get()
+    return Response(OrderOutSerializer(order).data)
+
+
 class AcceptOrderView(APIView):
 
     lookup_url = "uuid"
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, uuid):
-        order = Order.objects.filter(
-            Q(assigned_to=None) | Q(assigned_to=request.user),
-            uuid=uuid,
-            status="PENDING",
-            owned_by__in=[request.user.admin, request.user],
-        )
-
-        if not order:
+        if not transition_order(request.user, uuid, "accept"):
             return Response(data={"detail": "Order doesn't exists."}, status=404)
-        order = order.first()
-        order.status = "ACCEPTED"
-        if order.assigned_to is None:
-            order.assigned_to = request.user
-        order.save()
-        return Response(OrderOutSerializer(order).data)
+        return order_response(uuid)
 
 
 class DeclineAssignedOrderView(APIView):
@@ -107,19 +170,9 @@ class DeclineAssignedOrderView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, uuid):
-        try:
-            order = Order.objects.get(
-                uuid=uuid,
-                assigned_to__in=[request.user, None],
-                status="PENDING",
-                owned_by__in=[request.user.admin, request.user],
-            )
-        except Order.DoesNotExist:
+        if not transition_order(request.user, uuid, "reject"):
             return Response(data={"detail": "Order doesn't exists."}, status=404)
-
-        order.assigned_to = None
-        order.save()
-        return Response(OrderOutSerializer(order).data)
+        return order_response(uuid)
 
 
 class GetUserPendingOrderView(APIView):
@@ -127,10 +180,12 @@ class GetUserPendingOrderView(APIView):
 
     def get(self, request):
         try:
-            orders = Order.objects.filter(
-                assigned_to=request.user,
-                status="PENDING",
-                owned_by__in=[request.user.admin, request.user],
+            orders = with_order_details(
+                Order.objects.filter(
+                    assigned_to=request.user,
+                    status="PENDING",
+                    owned_by__in=[request.user.admin, request.user],
+                )
             )
         except Order.DoesNotExist:
             return Response(data={"detail": "Order doesn't exists."}, status=404)
@@ -143,10 +198,12 @@ class GetUserAcceptedOrderView(APIView):
 
     def get(self, request):
         try:
-            orders = Order.objects.filter(
-                assigned_to=request.user,
-                status="ACCEPTED",
-                owned_by__in=[request.user.admin, request.user],
+            orders = with_order_details(
+                Order.objects.filter(
+                    assigned_to=request.user,
+                    status="ACCEPTED",
+                    owned_by__in=[request.user.admin, request.user],
+                )
             )
         except Order.DoesNotExist:
             return Response(data={"detail": "Order doesn't exists."}, status=404)
@@ -159,17 +216,6 @@ class DeclineAcceptedOrderView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, uuid):
-        try:
-            order = Order.objects.get(
-                uuid=uuid,
-                assigned_to=request.user,
-                status="ACCEPTED",
-                owned_by=request.user.admin or request.user,
-            )
-        except Order.DoesNotExist:
+        if not transition_order(request.user, uuid, "reject_accepted"):
             return Response(data={"detail": "Order doesn't exists."}, status=404)
-
-        order.assigned_to = None
-        order.status = "PENDING"
-        order.save()
-        return Response(OrderOutSerializer(order).data)
+        return order_response(uuid)
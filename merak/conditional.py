@@ -0,0 +1,112 @@
+import hashlib
+from functools import partial
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """A weak ETag over ``parts``, timestamps included to the microsecond."""
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+    return 'W/"{}"'.format(digest)
+
+
+class ConditionalGetMixin:
+    """Weak ETags and Last-Modified headers on ``retrieve`` and ``list``.
+
+    ``version_fields`` are the ``updated_at`` columns the payload is rendered
+    from: the row's own and those of the related rows it nests. A detail
+    version is read with one indexed lookup of those columns and a list
+    version is their ``MAX`` plus the row count, so a matching
+    ``If-None-Match`` (or ``If-Modified-Since`` on a detail) gets a 304
+    before any serializer runs. Deleting a nested row changes the count and
+    therefore the ETag, even though no timestamp moved.
+
+    ``get_version_tags`` adds versions kept elsewhere, for nested rows that
+    are too many to join on every request. A detail with tags gets no
+    Last-Modified, which its own timestamp alone can't vouch for.
+    """
+
+    version_fields = ("updated_at",)
+
+    def get_version_tags(self):
+        return ()
+
+    def get_version_queryset(self, queryset):
+        # The prefetches and select_related of get_queryset aren't needed to
+        # read a few timestamps.
+        return queryset.order_by().prefetch_related(None).select_related(None)
+
+    def get_detail_version(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_version_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        # One row per nested row, all of them for the same object.
+        rows = list(queryset.values_list(*self.version_fields))
+        if not rows:
+            return None
+        stamps = [stamp for row in rows for stamp in row if stamp is not None]
+        return max(stamps, default=None), len(rows)
+
+    def get_list_version(self, queryset):
+        queryset = self.get_version_queryset(queryset)
+        if queryset.query.annotations:
+            # Aggregating an annotated queryset computes every annotation
+            # for every row first.
+            queryset = queryset.model.objects.filter(pk__in=queryset.values("pk"))
+        versions = queryset.aggregate(
+            count=Count("pk", distinct=True),
+            nested=Count("pk"),
+            **{
+                "latest_{}".format(i): Max(field)
+                for i, field in enumerate(self.version_fields)
+            }
+        )
+        stamps = [
+            versions["latest_{}".format(i)] for i in range(len(self.version_fields))
+        ]
+        stamps = [stamp for stamp in stamps if stamp is not None]
+        return max(stamps, default=None), (versions["count"], versions["nested"])
+
+    def conditional_response(self, request, render, etag, last_modified=None):
+        """Answer with a 304 when the client's copy is current, else ``render()``."""
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = render()
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        render = partial(super().retrieve, request, *args, **kwargs)
+        version = self.get_detail_version()
+        if version is None:
+            # Let get_object raise the 404.
+            return render()
+        latest, count = version
+        tags = self.get_version_tags()
+        # ?fields= and ?expand= make other representations of the same row.
+        etag = make_etag(latest, count, *tags, request.get_full_path())
+        return self.conditional_response(
+            request, render, etag, last_modified=None if tags else latest
+        )
+
+    def list(self, request, *args, **kwargs):
+        render = partial(super().list, request, *args, **kwargs)
+        latest, counts = self.get_list_version(
+            self.filter_queryset(self.get_queryset())
+        )
+        # A deleted row changes the count but not the newest timestamp, so
+        # lists get no Last-Modified. The same rows make different pages,
+        # hence the query string.
+        etag = make_etag(
+            latest, *counts, *self.get_version_tags(), request.get_full_path()
+        )
+        return self.conditional_response(request, render, etag)
@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from inventory.services.rendition import rendition_urls
+
+
+class RenditionsField(serializers.Field):
+    """``{"thumb": url, "medium": url}`` of the instance's image, or null."""
+
+    def __init__(self, image_field="image", **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+        self.image_field = image_field
+
+    def to_representation(self, instance):
+        urls = rendition_urls(
+            getattr(instance, self.image_field), instance.image_renditions
+        )
+        request = self.context.get("request")
+        if urls and request is not None:
+            urls = {name: request.build_absolute_uri(url) for name, url in urls.items()}
+        return urls
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from merak.storage import CONTENT_DIRECTORY
+
+# (model, field name, derived) of every file field whose files may be shared.
+FILE_FIELDS = []
+
+
+def register_file_field(model, field, derived=None):
+    """Count the files ``model.field`` names as used, see sweep_files.
+
+    ``derived(name)`` lists the files made from one, e.g. its renditions,
+    which are kept for as long as it is. Each app registers its own fields.
+    """
+    FILE_FIELDS.append((model, field, derived))
+
+
+def _names(model, field):
+    # The base manager also sees soft deleted users, which may be restored.
+    return (
+        model._base_manager.exclude(**{field: ""})
+        .exclude(**{f"{field}__isnull": True})
+        .values_list(field, flat=True)
+        .distinct()
+    )
+
+
+def is_referenced(name):
+    """Whether any registered row still uses the file ``name``."""
+    return any(
+        _names(model, field).filter(**{field: name}).exists()
+        for model, field, derived in FILE_FIELDS
+    )
+
+
+def referenced_names():
+    """Every file a registered row uses, and the files derived from them."""
+    names = set()
+    for model, field, derived in FILE_FIELDS:
+        for name in _names(model, field).iterator():
+            names.add(name)
+            names.update(derived(name) if derived else ())
+    return names
+
+
+def release_file(storage, name, derived=()):
+    """Delete ``name`` and the files ``derived`` from it if no row uses it.
+
+    Only for names no upload can get again, like those of files stored
+    before content addressing; shared files are left to sweep_files.
+    Returns whether the files were deleted.
+    """
+    if not name or is_referenced(name):
+        return False
+    for derived_name in derived:
+        storage.delete(derived_name)
+    storage.delete(name)
+    return True
+
+
+def _content_files(storage, directory=CONTENT_DIRECTORY):
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield "{}/{}".format(directory, name)
+    for name in directories:
+        yield from _content_files(storage, "{}/{}".format(directory, name))
+
+
+def sweep_files(storage, grace, dry_run=False):
+    """Delete the content addressed files no registered row uses.
+
+    Files written or touched in the last ``grace`` seconds are kept: saving
+    bytes that are already stored touches the file, so an upload reusing it
+    has until then to commit the row that references it. Returns the names
+    deleted, or that would be with ``dry_run``.
+    """
+    # Taken before reading the references, so a file reused after that
+    # read is newer than the cutoff.
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    referenced = referenced_names()
+    swept = []
+    for name in _content_files(storage):
+        if name in referenced or storage.get_modified_time(name) >= cutoff:
+            continue
+        if not dry_run:
+            storage.delete(name)
+        swept.append(name)
+    return swept
@@ -0,0 +1,155 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from merak.storage import content_digest
+
+# Files stored under the hash of their bytes never change under their name.
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Anything else is revalidated with its ETag on every use.
+REVALIDATE = "public, no-cache"
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(name, stat):
+    digest = content_digest(name)
+    if digest:
+        # The name is the hash of the bytes, which makes a strong validator.
+        return '"{}"'.format(digest)
+    return '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+
+
+def parse_range(header, size):
+    """``(start, end)`` of a single ``bytes=`` range, end included.
+
+    None when the whole file should be sent; several ranges are answered
+    with the whole file too, which RFC 7233 allows. Raises ValueError for a
+    range that starts past the end of the file.
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 is the last 500 bytes.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError(header)
+    if end < start:
+        return None
+    return start, end
+
+
+def _range_is_current(request, etag, last_modified):
+    # A client resuming a download only gets the part it asks for while the
+    # file is still the one it started with.
+    validator = request.META.get("HTTP_IF_RANGE")
+    if not validator:
+        return True
+    if validator.startswith('"'):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
+
+
+def _sendfile(path, name):
+    header = settings.MEDIA_SENDFILE_HEADER
+    response = HttpResponse()
+    if header == "X-Accel-Redirect":
+        # An nginx ``internal`` location aliased to MEDIA_ROOT, it handles
+        # ranges and conditionals from the headers set here.
+        response[header] = settings.MEDIA_SENDFILE_PREFIX + quote(name)
+    else:
+        response[header] = path
+    # Let the front server pick the type from the file it sends.
+    del response["Content-Type"]
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an upload with validators, byte ranges and caching headers.
+
+    Files stored under the hash of their bytes get it as a strong ETag and
+    a year of ``immutable`` caching, since new bytes get a new URL; the
+    renditions derived from them are revalidated like any other file. When MEDIA_SENDFILE_HEADER is
+    set the worker only checks the request and hands the transfer to the
+    front server, otherwise the requested range is streamed from disk.
+    """
+    name = posixpath.normpath(path).lstrip("/")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404(path)
+    if not os.path.isfile(full_path):
+        raise Http404(path)
+
+    etag = _etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.MEDIA_SENDFILE_HEADER:
+            response = _sendfile(full_path, name)
+        else:
+            response = _stream(request, full_path, stat.st_size, etag, last_modified)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = IMMUTABLE if content_digest(name) else REVALIDATE
+    return response
+
+
+def _stream(request, full_path, size, etag, last_modified):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    byte_range = None
+    if "HTTP_RANGE" in request.META and _range_is_current(
+        request, etag, last_modified
+    ):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = "bytes */{}".format(size)
+            return response
+
+    stream = open(full_path, "rb")
+    if byte_range is None:
+        response = FileResponse(stream, content_type=content_type)
+    else:
+        start, end = byte_range
+        stream.seek(start)
+        response = FileResponse(
+            _read(stream, end - start + 1), content_type=content_type, status=206
+        )
+        # FileResponse closes what it streams, not the file behind a generator.
+        response._resource_closers.append(stream.close)
+        response["Content-Range"] = "bytes {}-{}/{}".format(start, end, size)
+        response["Content-Length"] = end - start + 1
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _read(stream, length, chunk_size=FileResponse.block_size):
+    while length > 0:
+        chunk = stream.read(min(chunk_size, length))
+        if not chunk:
+            break
+        length -= len(chunk)
+        yield chunk
@@ -0,0 +1,99 @@
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over the view's ``cursor_ordering``.
+
+    DRF's cursor holds the first ordering field of the last row read, so a
+    page is ``WHERE <timestamp> < <last timestamp> ORDER BY <timestamp>, id``
+    plus a small OFFSET past the rows that share that timestamp; the id only
+    breaks ties in the ordering, it isn't part of the filter. Every page
+    costs about the same however deep it is, and rows inserted while a
+    client walks the list don't shift the pages it hasn't read yet. The
+    (timestamp, id) ordering should be backed by a composite index.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "-pk"
+
+    def get_ordering(self, request, queryset, view):
+        # A client supplied ?ordering= would need an index of its own, so the
+        # cursor always walks the view's keyset.
+        return getattr(view, "cursor_ordering", self.ordering)
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """Limit/offset pages by default, keyset pages on ``?pagination=cursor``.
+
+    The cursor mode's ``next`` and ``previous`` links carry the ``cursor``
+    parameter, which keeps later requests in the same mode.
+    """
+
+    mode_query_param = "pagination"
+    cursor_pagination_class = KeysetPagination
+    keyset = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.keyset = self.cursor_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.keyset is not None:
+            return self.keyset.get_html_context()
+        return super().get_html_context()
+
+    def get_schema_fields(self, view):
+        assert coreapi is not None, "coreapi must be installed to use `get_schema_fields()`"
+        assert coreschema is not None, "coreschema must be installed to use `get_schema_fields()`"
+        fields = super().get_schema_fields(view)
+        fields.append(
+            coreapi.Field(
+                name=self.mode_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.Enum(
+                    enum=["cursor"],
+                    title="Pagination",
+                    description="Set to `cursor` to page with cursors instead of offsets.",
+                ),
+            )
+        )
+        names = {field.name for field in fields}
+        return fields + [
+            field
+            for field in self.cursor_pagination_class().get_schema_fields(view)
+            if field.name not in names
+        ]
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        names = {parameter["name"] for parameter in parameters}
+        parameters.append(
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `cursor` to page with cursors instead of offsets.",
+                "schema": {"type": "string", "enum": ["cursor"]},
+            }
+        )
+        return parameters + [
+            parameter
+            for parameter in self.cursor_pagination_class().get_schema_operation_parameters(view)
+            if parameter["name"] not in names
+        ]
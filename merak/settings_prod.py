@@ -201,6 +201,13 @@ SIMPLE_JWT = {
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
+# Hand media transfers to the front server: "X-Accel-Redirect" for nginx,
+# with MEDIA_SENDFILE_PREFIX an internal location aliased to MEDIA_ROOT, or
+# "X-Sendfile" for Apache and lighttpd. Empty streams them from Django.
+MEDIA_SENDFILE_HEADER = os.environ.get("MEDIA_SENDFILE_HEADER", "")
+MEDIA_SENDFILE_PREFIX = os.environ.get("MEDIA_SENDFILE_PREFIX", "/protected-media/")
+# Uploads are named after their content, identical files are stored once.
+DEFAULT_FILE_STORAGE = "merak.storage.ContentAddressedStorage"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATIC_URL = "/static/"
 # Following settings only make sense on production and may break development environments.
@@ -215,6 +222,22 @@ if not DEBUG:  # Tell Django to copy statics to the `staticfiles` directory
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cached catalog lists are invalidated by whichever process writes, so any
+# deployment with several web or celery workers needs a cache they share:
+# CACHE_BACKEND=django_redis.cache.RedisCache with
+# CACHE_LOCATION=redis://localhost:6379/1, as compose.yaml and render.yaml
+# set. The LocMemCache fallback is per process, only fit for one worker.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+# Seconds a cached catalog list lives, writes invalidate it sooner.
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 300))
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "apiKey": {
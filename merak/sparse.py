@@ -0,0 +1,141 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+
+def parse_field_paths(value):
+    """``"a,b.c,b.d"`` -> ``{"a": {}, "b": {"c": {}, "d": {}}}``."""
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def _nested(field):
+    """The serializer rendered by ``field``, None for a plain field."""
+    field = getattr(field, "child", field)
+    return field if isinstance(field, serializers.BaseSerializer) else None
+
+
+def _collapsed(name, field):
+    # The primary key of the related row, read from the foreign key column
+    # (or the prefetched rows of a many relation) without loading more.
+    many = isinstance(field, serializers.ListSerializer)
+    kwargs = {"read_only": True, "many": many}
+    if field.source and field.source != name:
+        kwargs["source"] = field.source
+    return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+class SparseFieldsSerializerMixin:
+    """``fields`` and ``expand`` options for a serializer and those it nests.
+
+    ``fields="invoice,status,items.quantity"`` keeps only the named fields,
+    dotted names reach into nested serializers and a nested field named on
+    its own keeps all of its fields. ``expand="items.product"``, when given,
+    renders every nested serializer it doesn't name as the related primary
+    key(s); without it everything nests as declared. Both are checked
+    against the declared fields, unknown names are a validation error.
+
+    ``field_lookups`` names what a field reads besides its own column, e.g.
+    ``{"line_total": ("product",)}``, so get_lookups can tell the queryset
+    which joins, prefetches and annotations the response still needs.
+    """
+
+    field_lookups = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.only = parse_field_paths(fields) if isinstance(fields, str) else fields
+        self.expand = parse_field_paths(expand) if isinstance(expand, str) else expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for option, names in (("fields", self.only), ("expand", self.expand)):
+            unknown = set(names or ()) - set(fields)
+            # A plain field has nothing to reach into, "invoice.x" is unknown.
+            unknown |= {
+                "{}.{}".format(name, child)
+                for name, children in (names or {}).items()
+                if name in fields and _nested(fields[name]) is None
+                for child in children
+            }
+            if option == "expand":
+                # Only nested serializers expand.
+                unknown |= {
+                    name
+                    for name in names or ()
+                    if name in fields and _nested(fields[name]) is None
+                }
+            if unknown:
+                raise serializers.ValidationError(
+                    {option: ["Unknown field {}".format(", ".join(sorted(unknown)))]}
+                )
+
+        if self.only:
+            fields = {
+                name: field for name, field in fields.items() if name in self.only
+            }
+        for name, field in list(fields.items()):
+            nested = _nested(field)
+            if nested is None:
+                continue
+            if self.expand is not None and name not in self.expand:
+                fields[name] = _collapsed(name, field)
+            elif isinstance(nested, SparseFieldsSerializerMixin):
+                nested.only = (self.only or {}).get(name) or None
+                nested.expand = None if self.expand is None else self.expand[name]
+        return fields
+
+    def get_lookups(self, prefix=""):
+        """``__`` separated paths of the relations and annotations rendered."""
+        lookups = set()
+        for name, field in self.fields.items():
+            for lookup in self.field_lookups.get(name, ()):
+                lookups.add(prefix + lookup)
+            if field.source == "*":
+                continue
+            path = prefix + "__".join(field.source_attrs)
+            nested = _nested(field)
+            if isinstance(field, ManyRelatedField) or nested is not None:
+                lookups.add(path)
+            if isinstance(nested, SparseFieldsSerializerMixin):
+                lookups |= nested.get_lookups(path + "__")
+        return lookups
+
+
+class SparseFieldsMixin:
+    """``?fields=`` and ``?expand=`` on the responses of a viewset.
+
+    They are passed to a serializer_class using SparseFieldsSerializerMixin
+    on safe requests. get_sparse_lookups tells get_queryset what the
+    response still reads, so the joins, prefetches and subqueries of the
+    fields left out can be skipped too.
+    """
+
+    sparse_params = ("fields", "expand")
+
+    def get_sparse_options(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return {}
+        params = self.request.query_params
+        return {name: params[name] for name in self.sparse_params if name in params}
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SparseFieldsSerializerMixin):
+            kwargs = {**self.get_sparse_options(), **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def get_sparse_lookups(self):
+        """The lookups the response reads, None when it reads everything."""
+        options = self.get_sparse_options()
+        serializer_class = self.get_serializer_class()
+        if not options or not issubclass(
+            serializer_class, SparseFieldsSerializerMixin
+        ):
+            return None
+        serializer = serializer_class(context=self.get_serializer_context(), **options)
+        return serializer.get_lookups()
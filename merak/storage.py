@@ -0,0 +1,96 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_DIRECTORY = "content"
+CONTENT_NAME = re.compile(
+    r"^{}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.[\w-]+)*$".format(
+        CONTENT_DIRECTORY
+    )
+)
+STORED_NAME = re.compile(
+    r"^{}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[a-z0-9]{{1,10}})?$".format(
+        CONTENT_DIRECTORY
+    )
+)
+
+
+def content_name(digest, extension=""):
+    """``content/ab/cd/abcd...<sha256>.jpg``."""
+    return "{}/{}/{}/{}{}".format(
+        CONTENT_DIRECTORY, digest[:2], digest[2:4], digest, extension
+    )
+
+
+def is_content_name(name):
+    """Whether ``name`` is a content addressed file or one derived from it."""
+    return bool(CONTENT_NAME.match(name.replace("\\", "/")))
+
+
+def content_digest(name):
+    """The SHA-256 of the bytes of a stored file, None for any other name.
+
+    Only ``content/ab/cd/abcd...<sha256><ext>`` itself has one; the files
+    derived from it, like ``<sha256>.thumb.jpg``, aren't named after their
+    own bytes.
+    """
+    name = name.replace("\\", "/")
+    match = STORED_NAME.match(name)
+    if match is None or content_name(*match.groups("")) != name:
+        return None
+    return match.group(1)
+
+
+def hash_file(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Media storage that names every file after the SHA-256 of its bytes.
+
+    The same photo uploaded for twenty variants is stored once: saving bytes
+    that are already stored returns the existing name without writing.
+    The ``upload_to`` directory is ignored, so identical files dedupe
+    across models too. Names derived from a stored name, like the renditions
+    ``<hash>.thumb.jpg``, are kept as given. Files are shared, so they are
+    only deleted by merak.files.sweep_files, once nothing references them.
+    """
+
+    content_addressed = True
+
+    def is_content_name(self, name):
+        return is_content_name(name)
+
+    def get_content_name(self, name, content):
+        """The name ``content`` is stored under, keeping ``name``'s extension."""
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r"\.[a-z0-9]{1,10}", extension):
+            extension = ""
+        return content_name(hash_file(content), extension)
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        if not self.is_content_name(name):
+            name = self.get_content_name(name, content)
+        if self.touch(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def touch(self, name):
+        """Mark a stored file as just used, False when it isn't stored.
+
+        sweep_files keeps recently touched files, which gives the row about
+        to reference a reused file time to be committed.
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
@@ -1,11 +1,14 @@
+import re
+
 from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include, re_path
-from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from merak.media import serve_media
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Snippets API",
@@ -38,4 +41,9 @@ urlpatterns = [
     path("user/", include("user.urls")),
     path("audit/", include("audit.urls")),
     path("tracking/", include("tracking.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(
+        r"^{}(?P<path>.+)$".format(re.escape(settings.MEDIA_URL.lstrip("/"))),
+        serve_media,
+        name="media",
+    ),
+]
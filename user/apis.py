@@ -11,6 +11,7 @@ from rest_framework.views import APIView
 
 from user.models import Attendance, Customer, Organization, Team
 from user.permissions import UserIsOwner
+from merak.sparse import SparseFieldsMixin
 
 from user.serializer import (
     CustomerSerializer,
@@ -85,7 +86,7 @@ class PunchOutView(APIView):
         return Response({"message": "Success"}, status=201)
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     model = Attendance
     serializer_class = serializer.AttendanceSerializer
     permission_classes = (UserIsOwner,)
@@ -93,7 +94,11 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         tema_members = Organization.objects.get(owner=self.request.user).user_set.all()
-        return Attendance.objects.filter(user__in=tema_members)
+        queryset = Attendance.objects.filter(user__in=tema_members)
+        lookups = self.get_sparse_lookups()
+        if lookups is None or "user" in lookups:
+            queryset = queryset.select_related("user")
+        return queryset
 
     def create(self, request, *args, **kwargs):
         user_id = request.data.get("user")
@@ -111,7 +116,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = CustomerSerializer
     queryset = Customer.objects.all()
     permission_classes = (UserIsOwner,)
@@ -5,4 +5,10 @@ class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
     verbose_name_plural = "Users"
-    verbose_name_plural = "User"
\ No newline at end of file
+    verbose_name_plural = "User"
+
+    def ready(self):
+        from merak.files import register_file_field
+
+        # Avatars are stored by content, so several users may share one file.
+        register_file_field(self.get_model("User"), "avatar")
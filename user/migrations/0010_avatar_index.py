@@ -0,0 +1,19 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:30
+
+from django.db import migrations, models
+import user.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_customer_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to=user.models.get_upload_path_for_avatar),
+        ),
+    ]
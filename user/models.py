@@ -78,7 +78,7 @@ class User(AbstractBaseUser, SafeDeleteModel, PermissionsMixin):
     first_name = models.CharField(max_length=64, null=True, blank=True)
     last_name = models.CharField(max_length=64, null=True, blank=True)
     avatar = models.ImageField(
-        upload_to=get_upload_path_for_avatar, null=True, blank=True
+        upload_to=get_upload_path_for_avatar, null=True, blank=True, db_index=True
     )
     gender = models.CharField(max_length=7, choices=GenderChoices.choices, null=True)
     birth_date = models.DateField(null=True)
@@ -91,6 +91,7 @@ class User(AbstractBaseUser, SafeDeleteModel, PermissionsMixin):
     )
 
     is_staff = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class UserStatusChoice(models.TextChoices):
         PENDING = _("Pending")
@@ -148,6 +149,7 @@ class Customer(models.Model):
     address = models.CharField(null=True, blank=True, max_length=100)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
 
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from merak.sparse import SparseFieldsSerializerMixin
 from user.models import Attendance, Customer, Organization, Team
 
 from .validators import validate_password
@@ -13,7 +14,7 @@ from .validators import validate_password
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     display_name = serializers.SerializerMethodField()
 
     @staticmethod
@@ -170,7 +171,7 @@ class TeamRegistrationSerializer(serializers.ModelSerializer):
         return team
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class AttendanceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
 
     user = UserSerializer(read_only=True)
 
@@ -179,7 +180,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
         fields = ("id", "user", "punch_in_time", "punch_out_time", "date")
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = "__all__"
@@ -0,0 +1,43 @@
+import pytest
+from rest_framework.test import APIClient
+
+from user.models import Customer, Organization, User
+
+
+@pytest.fixture
+def admin(db):
+    return User.objects.create_user(email="admin@test.com", password="test", status="Active")
+
+
+@pytest.fixture
+def organization(db, admin):
+    organization = Organization.objects.create(name="Test Organization", owner=admin)
+    admin.organization = organization
+    admin.save()
+    return organization
+
+
+@pytest.fixture
+def orderer(db, organization):
+    return Customer.objects.create(name="orderer", organization=organization)
+
+
+@pytest.fixture
+def regular_client(admin):
+    client = APIClient()
+    response = client.post("/user/auth/login/", {"email": "admin@test.com", "password": "test"})
+    client.credentials(HTTP_AUTHORIZATION="Bearer " + str(response.data.get("access")))
+    return client
+
+
+@pytest.mark.django_db
+def test_sparse_fields_on_user_viewsets(regular_client, orderer):
+    response = regular_client.get("/user/api/customer/", {"fields": "id,name"})
+    assert response.status_code == 200
+    assert [dict(row) for row in response.data["results"]] == [{"id": orderer.id, "name": "orderer"}]
+
+    response = regular_client.get("/user/profile/", {"fields": "id,display_name"})
+    assert set(response.data["results"][0]) == {"id", "display_name"}
+
+    response = regular_client.get("/user/api/customer/", {"fields": "name.first"})
+    assert response.status_code == 400
@@ -11,6 +11,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.serializers import ModelSerializer, SerializerMethodField, CharField
 from rest_framework import exceptions
 from user.permissions import UserIsOwner
+from merak.sparse import SparseFieldsMixin
 
 from user.utils import decrypt_string, send_password_reset_email
 from user.models import Customer, Organization, Team, User
@@ -27,7 +28,7 @@ from cryptography.fernet import InvalidToken
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.all()
     http_method_names = ("get", "put", "patch", "head", "options", "trace")
@@ -52,7 +53,9 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         if "avatar" in request.data:
-            instance.avatar.delete(save=False)
+            # The old file is deleted once no other row uses it, see
+            # merak.files.
+            instance.avatar = None
         self.perform_update(serializer)
 
         if getattr(instance, "_prefetched_objects_cache", None):